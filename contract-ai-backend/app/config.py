@@ -4,5 +4,18 @@ from dotenv import load_dotenv
 load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "200"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "10"))
 QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
+# Rows per collection.add() call during bulk ingest
+CHROMA_BATCH_SIZE = int(os.getenv("CHROMA_BATCH_SIZE", "200"))
+# HNSW graph parameters for new Chroma collections (only passed on create; existing
+# collections are opened with their stored settings)
+CHROMA_HNSW_M = int(os.getenv("CHROMA_HNSW_M", "16"))
+CHROMA_HNSW_CONSTRUCTION_EF = int(os.getenv("CHROMA_HNSW_CONSTRUCTION_EF", "64"))
+CHROMA_HNSW_SEARCH_EF = int(os.getenv("CHROMA_HNSW_SEARCH_EF", "40"))
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# DEBUG=1 adds the exception traceback to 500 responses (never enable in production)
+DEBUG = os.getenv("DEBUG", "0") == "1"
+# Comma-separated contract IDs to preload into the in-memory embedding cache at startup
+WARM_CONTRACT_IDS = [c.strip() for c in os.getenv("WARM_CONTRACT_IDS", "").split(",") if c.strip()]
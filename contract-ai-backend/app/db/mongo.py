@@ -1,13 +1,38 @@
-from pymongo import MongoClient
-from app.config import MONGO_URI
+from bson import ObjectId
+from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo.write_concern import WriteConcern
+from app.config import MONGO_URI, MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE
 
-client = MongoClient(MONGO_URI)
+# One pooled client per process; zstd is used when the zstandard package is installed
+client = MongoClient(
+    MONGO_URI,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    maxIdleTimeMS=300_000,
+    serverSelectionTimeoutMS=3000,
+    retryWrites=True,
+    compressors="zstd,zlib",
+)
 db = client["contracts_db"]
 
+# Bulk ingestion is re-runnable, so it skips waiting on the journal
+_INGEST_WRITE_CONCERN = WriteConcern(w=1, j=False)
+
+def ensure_indexes():
+    """Create the indexes used by clause queries (no-op if they already exist)"""
+    db.clauses.create_index([("category", ASCENDING), ("created_at", DESCENDING)])
+
 def save_contract_meta(meta):
     """Save contract metadata to the database"""
     return db.contracts.insert_one(meta)
 
+def save_contract_metas_bulk(metas):
+    """Save many contract metadata documents in one round-trip"""
+    if not metas:
+        return None
+    contracts = db.contracts.with_options(write_concern=_INGEST_WRITE_CONCERN)
+    return contracts.insert_many(metas, ordered=False, bypass_document_validation=True)
+
 def get_contract_meta(cid):
     """Get contract metadata by contract ID"""
     return db.contracts.find_one({"contract_id": cid})
@@ -16,21 +41,33 @@ def save_clause(clause):
     """Save a clause to the database"""
     return db.clauses.insert_one(clause)
 
+def save_clauses_bulk(clauses):
+    """Save many clauses in one round-trip"""
+    if not clauses:
+        return None
+    clauses_coll = db.clauses.with_options(write_concern=_INGEST_WRITE_CONCERN)
+    return clauses_coll.insert_many(clauses, ordered=False, bypass_document_validation=True)
+
 def get_clauses():
     """Get all clauses from the database"""
     return list(db.clauses.find({}))
 
+def iter_clauses(projection=None, batch_size=500):
+    """Stream clauses from a cursor, optionally projecting only some fields"""
+    return db.clauses.find({}, projection=projection).batch_size(batch_size)
+
+def count_clauses():
+    """Count clauses without fetching them"""
+    return db.clauses.count_documents({})
+
 def get_clause_by_id(clause_id):
     """Get a specific clause by ID"""
-    from bson import ObjectId
     return db.clauses.find_one({"_id": ObjectId(clause_id)})
 
 def update_clause(clause_id, updates):
     """Update a clause"""
-    from bson import ObjectId
     return db.clauses.update_one({"_id": ObjectId(clause_id)}, {"$set": updates})
 
 def delete_clause(clause_id):
     """Delete a clause"""
-    from bson import ObjectId
     return db.clauses.delete_one({"_id": ObjectId(clause_id)})
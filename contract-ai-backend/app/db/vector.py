@@ -1,7 +1,19 @@
 import chromadb
 from chromadb.config import Settings
 from typing import List, Dict, Any, Optional
+import threading
+import numpy as np
 import uuid
+from app.config import CHROMA_BATCH_SIZE, CHROMA_HNSW_M, CHROMA_HNSW_CONSTRUCTION_EF, CHROMA_HNSW_SEARCH_EF
+
+def _unit_rows(embeddings) -> np.ndarray:
+    """Contiguous float32 rows scaled to unit length (zero rows are left as is)"""
+    rows = np.ascontiguousarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(rows, axis=-1, keepdims=True)
+    return rows / np.where(norms > 0, norms, 1.0)
+
+def _is_number(v: Any) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
 
 class ChromaDBManager:
     def __init__(self, persist_directory: str = "./chroma_db"):
@@ -11,16 +23,46 @@ class ChromaDBManager:
             settings=Settings(anonymized_telemetry=False)
         )
         self.collections = {}
+        self._collections_lock = threading.Lock()
         
     def get_or_create_collection(self, name: str) -> Any:
-        """Get or create a collection"""
-        if name not in self.collections:
-            self.collections[name] = self.client.get_or_create_collection(
+        """Get or create a collection (resolved once per process, then served from memory)"""
+        collection = self.collections.get(name)
+        if collection is not None:
+            return collection
+        with self._collections_lock:
+            if name not in self.collections:
+                self.collections[name] = self._open_collection(name)
+            return self.collections[name]
+
+    def _open_collection(self, name: str) -> Any:
+        """
+        Open an existing collection as is; HNSW settings are only passed when creating one
+
+        get_or_create_collection(metadata=...) may rewrite an existing collection's metadata
+        depending on the chromadb version, which would relabel its distance space.
+        """
+        try:
+            return self.client.get_collection(name=name)
+        except Exception:
+            # Not found; the exception type differs between chromadb versions
+            pass
+        try:
+            return self.client.create_collection(
                 name=name,
-                metadata={"hnsw:space": "cosine"}
+                metadata={
+                    # Vectors are stored unit-length, so inner product ranks exactly like cosine
+                    # without the per-distance norm computation
+                    "hnsw:space": "ip",
+                    "hnsw:M": CHROMA_HNSW_M,
+                    "hnsw:construction_ef": CHROMA_HNSW_CONSTRUCTION_EF,
+                    "hnsw:search_ef": CHROMA_HNSW_SEARCH_EF
+                }
             )
-        return self.collections[name]
-    
+        except Exception:
+            # Created concurrently (e.g. by another worker process) since the lookup
+            return self.client.get_collection(name=name)
+
     def add_documents(self, 
                      documents: List[str], 
                      embeddings: List[List[float]], 
@@ -31,34 +73,79 @@ class ChromaDBManager:
         collection = self.get_or_create_collection(collection_name)
         collection.add(
             documents=documents,
-            embeddings=embeddings,
+            embeddings=_unit_rows(embeddings),
             metadatas=metadatas,
             ids=ids
         )
     
+    def add_documents_batched(self,
+                             documents: List[str],
+                             embeddings: List[List[float]],
+                             metadatas: List[Dict[str, Any]],
+                             ids: List[str],
+                             collection_name: str = "contracts",
+                             batch_size: int = CHROMA_BATCH_SIZE) -> None:
+        """Add documents in fixed-size slices to bound per-call memory on large ingests"""
+        collection = self.get_or_create_collection(collection_name)
+        # One contiguous, unit-normalized float32 buffer; each slice is a view handed to Chroma
+        # without per-row lists
+        embeddings = _unit_rows(embeddings)
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            collection.add(
+                documents=documents[start:end],
+                embeddings=embeddings[start:end],
+                metadatas=metadatas[start:end],
+                ids=ids[start:end]
+            )
+    
     def search_similar(self, 
                       query_embedding: List[float], 
                       collection_name: str = "contracts",
                       top_k: int = 5,
-                      where: Optional[Dict] = None) -> Dict[str, Any]:
-        """Search for similar documents"""
+                      where: Optional[Dict] = None,
+                      include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Search for similar documents; `include` narrows the fields returned (never embeddings by default)"""
         collection = self.get_or_create_collection(collection_name)
         results = collection.query(
-            query_embeddings=[query_embedding],
+            query_embeddings=_unit_rows([query_embedding]),
             n_results=top_k,
-            where=where
+            where=where,
+            include=include or ["documents", "metadatas", "distances"]
         )
         return results
     
+    def search_similar_batch(self,
+                            query_embeddings: List[List[float]],
+                            collection_name: str = "contracts",
+                            top_k: int = 5,
+                            where: Optional[Dict] = None,
+                            include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Search for several query vectors in a single call (one result list per query)"""
+        collection = self.get_or_create_collection(collection_name)
+        return collection.query(
+            query_embeddings=_unit_rows(query_embeddings),
+            n_results=top_k,
+            where=where,
+            include=include or ["documents", "metadatas", "distances"]
+        )
+    
     def get_collection_count(self, collection_name: str = "contracts") -> int:
         """Get count of documents in collection"""
         collection = self.get_or_create_collection(collection_name)
         return collection.count()
     
+    def count(self, where: Optional[Dict[str, Any]] = None, collection_name: str = "contracts") -> int:
+        """Count documents matching a metadata filter (ids only; no vector search)"""
+        collection = self.get_or_create_collection(collection_name)
+        if where is None:
+            return collection.count()
+        return len(collection.get(where=where, include=[])["ids"])
+    
     def delete_collection(self, collection_name: str) -> None:
         """Delete a collection"""
-        if collection_name in self.collections:
-            del self.collections[collection_name]
+        with self._collections_lock:
+            self.collections.pop(collection_name, None)
         try:
             self.client.delete_collection(collection_name)
         except:
@@ -84,7 +171,7 @@ class ChromaDBManager:
         collection.update(
             ids=ids,
             documents=documents,
-            embeddings=embeddings,
+            embeddings=_unit_rows(embeddings) if embeddings is not None else None,
             metadatas=metadatas
         )
 
@@ -109,19 +196,108 @@ class ChromaDBManager:
             where=where,
             limit=limit,
             offset=offset,
-            include=include or ["documents", "metadatas", "ids"]
+            # ids are always returned; listing "ids" in include is rejected by newer Chroma
+            include=include if include is not None else ["documents", "metadatas"]
+        )
+
+    def get_documents_page(self,
+                           after_key: Optional[float] = None,
+                           limit: int = 100,
+                           where: Optional[Dict[str, Any]] = None,
+                           include: Optional[List[str]] = None,
+                           collection_name: str = "contracts",
+                           key: str = "seq") -> Dict[str, Any]:
+        """
+        Get a page of documents in order of their numeric `key` metadata
+
+        Returns rows with key > after_key (the first page when after_key is None) through a
+        single filtered get, so a page costs the same at any depth.
+
+        Chroma has no ORDER BY: `limit` takes the first matching rows in storage (insertion)
+        order. Pages are therefore exact only while storage order equals key order, which
+        holds because keys are assigned increasing at insert (new_seq()) and backfill_key()
+        numbers older rows 0..n-1 in storage order, below every new_seq() value. Rows are
+        sorted by key within the page so its last row is the next cursor.
+        """
+        collection = self.get_or_create_collection(collection_name)
+        cond = {key: {"$gt": after_key}} if after_key is not None else {key: {"$gte": 0}}
+        fields = list(include) if include is not None else ["documents", "metadatas"]
+        res = collection.get(
+            where={"$and": [where, cond]} if where else cond,
+            limit=limit,
+            include=fields if "metadatas" in fields else fields + ["metadatas"]
+        )
+        metas = res.get("metadatas") or []
+        order = sorted(range(len(res["ids"])), key=lambda i: (metas[i] or {}).get(key, 0))
+        return {f: [res[f][i] for i in order] for f in ["ids"] + fields}
+
+    def get_documents_after(self,
+                            after_id: str,
+                            limit: int = 100,
+                            where: Optional[Dict[str, Any]] = None,
+                            include: Optional[List[str]] = None,
+                            collection_name: str = "contracts",
+                            key: str = "seq") -> Dict[str, Any]:
+        """
+        Get the page of documents that follows after_id in `key` order (see get_documents_page)
+
+        Raises:
+            KeyError: after_id does not exist or has no numeric `key`
+        """
+        collection = self.get_or_create_collection(collection_name)
+        anchor = collection.get(ids=[after_id], include=["metadatas"])
+        anchor_md = (anchor.get("metadatas") or [None])[0] or {}
+        anchor_key = anchor_md.get(key)
+        if not anchor.get("ids") or not _is_number(anchor_key):
+            raise KeyError(after_id)
+        return self.get_documents_page(
+            after_key=anchor_key, limit=limit, where=where, include=include,
+            collection_name=collection_name, key=key
         )
 
+    def backfill_key(self, collection_name: str = "contracts", key: str = "seq") -> int:
+        """
+        Give rows written before `key` existed a numeric `key`: their storage position
+
+        Reads every row's metadata once; meant for startup, not the request path.
+
+        Returns:
+            Number of rows updated
+        """
+        collection = self.get_or_create_collection(collection_name)
+        res = collection.get(include=["metadatas"])
+        ids = res.get("ids") or []
+        metas = res.get("metadatas") or []
+        missing = [
+            (id_, {**(md or {}), key: pos})
+            for pos, (id_, md) in enumerate(zip(ids, metas))
+            if not _is_number((md or {}).get(key))
+        ]
+        for start in range(0, len(missing), CHROMA_BATCH_SIZE):
+            batch = missing[start:start + CHROMA_BATCH_SIZE]
+            collection.update(ids=[id_ for id_, _ in batch], metadatas=[md for _, md in batch])
+        return len(missing)
+
 # Global instance
 chroma_manager = ChromaDBManager()
 
 # Convenience functions for backward compatibility
-def search_embeddings(query_embedding: List[float], collection_name: str = "contracts", top_k: int = 5) -> Dict[str, Any]:
+def search_embeddings(query_embedding: List[float], collection_name: str = "contracts", top_k: int = 5, include: Optional[List[str]] = None) -> Dict[str, Any]:
     """Search for similar documents using embeddings"""
     return chroma_manager.search_similar(
         query_embedding=query_embedding,
         collection_name=collection_name,
-        top_k=top_k
+        top_k=top_k,
+        include=include
+    )
+
+def search_embeddings_batch(query_embeddings: List[List[float]], collection_name: str = "contracts", top_k: int = 5, include: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Search for several query vectors in one call; index i of each field belongs to query i"""
+    return chroma_manager.search_similar_batch(
+        query_embeddings=query_embeddings,
+        collection_name=collection_name,
+        top_k=top_k,
+        include=include
     )
 
 def get_collection_info(collection_name: str = "contracts") -> Dict[str, Any]:
@@ -1,4 +1,8 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, ORJSONResponse
+import asyncio
+import logging
+import traceback
 
 from fastapi.middleware.cors import CORSMiddleware
  
@@ -15,8 +19,54 @@ from app.routes.reports import router as reports_router
 from app.routes.checklist import router as checklist_router
 from app.routes.policies import router as policies_router
 from app.routes.compliance_docx import router as compliance_docx_router
+from app.config import WARM_CONTRACT_IDS, DEBUG
+from app.db.mongo import ensure_indexes
+from app.db.vector import chroma_manager
+from app.services import embedding_cache, ingest, semantic_cache
+from app.services.embeddings import embed_text, embed_chunks
  
-app = FastAPI(title="Contract AI Backend")
+# orjson encodes the large chunk/result lists several times faster than json.dumps
+app = FastAPI(title="Contract AI Backend", default_response_class=ORJSONResponse)
+
+logger = logging.getLogger(__name__)
+
+class UnhandledErrorMiddleware:
+    """
+    Turn unexpected errors into a generic 500 (logged server-side, no internals)
+
+    Registered before CORSMiddleware so it runs inside it: the 500 still gets CORS headers,
+    unlike an Exception handler, which Starlette runs in the outermost ServerErrorMiddleware.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = False
+
+        async def send_tracked(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_tracked)
+        except Exception as exc:
+            # The logger formats the traceback only if a handler is enabled for ERROR
+            logger.error("Unhandled error on %s %s", scope["method"], scope["path"], exc_info=exc)
+            if started:
+                # Headers already went out (e.g. a failing stream); nothing sensible to send
+                raise
+            detail = "Internal server error"
+            if DEBUG:
+                detail = "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+            await JSONResponse(status_code=500, content={"detail": detail})(scope, receive, send)
+
+app.add_middleware(UnhandledErrorMiddleware)
  
 # ✅ CORS Middleware
 
@@ -62,6 +112,45 @@ app.include_router(reports_router, prefix="/reports", tags=["reports"])
 app.include_router(policies_router, prefix="/policies", tags=["policies"])
 app.include_router(compliance_docx_router, prefix="/compliance", tags=["compliance"])
 
+@app.on_event("startup")
+async def warmup():
+    """Run encoder passes and open collections before the first request arrives"""
+    await asyncio.to_thread(embed_text, "warmup")
+    # A batched pass too, so lazy init (and torch.compile when enabled) isn't paid by the first upload
+    await asyncio.to_thread(embed_chunks, ["warmup"] * 8)
+    for name in ("contracts", "standard_clauses"):
+        await asyncio.to_thread(chroma_manager.get_or_create_collection, name)
+    try:
+        # Clauses stored before seq existed get one, so cursor pagination covers them
+        backfilled = await asyncio.to_thread(chroma_manager.backfill_key, "standard_clauses", "seq")
+        if backfilled:
+            print(f"Assigned pagination seq to {backfilled} existing clauses")
+    except Exception as e:
+        print(f"⚠️ Could not backfill clause seq: {e}")
+    try:
+        await asyncio.to_thread(ensure_indexes)
+    except Exception as e:
+        print(f"⚠️ Could not ensure MongoDB indexes: {e}")
+    await asyncio.to_thread(embedding_cache.load_snapshot)
+    try:
+        await asyncio.to_thread(semantic_cache.purge_expired)
+    except Exception as e:
+        print(f"⚠️ Could not purge expired semantic cache entries: {e}")
+    # Keep references so the preload tasks aren't garbage-collected mid-flight
+    app.state.warm_tasks = [
+        asyncio.create_task(asyncio.to_thread(embedding_cache.warm, cid))
+        for cid in WARM_CONTRACT_IDS
+    ]
+
+@app.on_event("shutdown")
+async def snapshot_embedding_cache():
+    """Persist in-memory chunk matrices so the next start skips re-fetching them"""
+    await asyncio.to_thread(embedding_cache.save_snapshot)
+
+@app.on_event("shutdown")
+async def stop_ingest_workers():
+    ingest.shutdown_pool()
+
 @app.get("/")
 async def root():
     return {"message": "Contract AI Backend is running"}
@@ -1,8 +1,9 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict, TypeAdapter, field_validator
+from typing import Any, Optional, List
 from datetime import datetime
 
 class Clause(BaseModel):
+    model_config = ConfigDict(extra='ignore')
     title: str
     text: str
     category: str
@@ -11,9 +12,32 @@ class Clause(BaseModel):
     created_at: Optional[datetime] = None
 
 class ClauseResponse(BaseModel):
+    model_config = ConfigDict(extra='ignore')
     id: str
     title: str
     text: str
     category: str
     description: Optional[str] = None
     tags: Optional[List[str]] = []
+
+class ClauseIn(BaseModel):
+    """Clause accepted by /upload-json; values are kept as sent (metadata is made scalar on write)"""
+    model_config = ConfigDict(extra='ignore', coerce_numbers_to_str=True)
+    title: Any
+    category: Any
+    text: str
+    source: Any = None
+    version: Any = None
+    jurisdiction: Any = None
+    tags: Any = None
+    clause_id: Optional[str] = None
+
+    @field_validator('title', 'category', 'text')
+    @classmethod
+    def _not_blank(cls, v: Any) -> Any:
+        if not v or not str(v).strip():
+            raise ValueError("Missing or empty field")
+        return v
+
+# Validates a whole upload in one pydantic-core call
+CLAUSES_IN_ADAPTER = TypeAdapter(List[ClauseIn])
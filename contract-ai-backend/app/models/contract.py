@@ -1,24 +1,28 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import List, Optional
 
 class ContractUploadResponse(BaseModel):
+    model_config = ConfigDict(extra='ignore')
     contract_id: str
     filename: str
     chunks_processed: int
     document_ids: List[str]
 
 class SearchQuery(BaseModel):
+    model_config = ConfigDict(extra='ignore')
     text: str
     top_k: Optional[int] = 5
     contract_id: Optional[str] = None
 
 class SearchResult(BaseModel):
+    model_config = ConfigDict(extra='ignore')
     text: str
-    contract_id: Optional[str]
-    chunk_index: Optional[int]
+    contract_id: Optional[str] = None
+    chunk_index: Optional[int] = None
     score: float
 
 class SearchResponse(BaseModel):
+    model_config = ConfigDict(extra='ignore')
     query: str
     results: List[SearchResult]
     total_results: int
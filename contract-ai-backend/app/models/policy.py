@@ -0,0 +1,37 @@
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError, field_validator
+from typing import Any, List
+
+class EvidenceSpan(BaseModel):
+    model_config = ConfigDict(extra='ignore')
+    start: int = 0
+    end: int = 0
+
+    @field_validator('start', 'end')
+    @classmethod
+    def _non_negative(cls, v: int) -> int:
+        return max(0, v)
+
+class PolicyEvidence(BaseModel):
+    """One evidence item of an LLM policy decision, coerced to the response shape"""
+    model_config = ConfigDict(extra='ignore')
+    chunk_index: int
+    quote: str = ""
+    span: EvidenceSpan = Field(default_factory=EvidenceSpan)
+
+    @field_validator('quote', mode='before')
+    @classmethod
+    def _clip_quote(cls, v: Any) -> str:
+        return str(v)[:1000]
+
+# Validates all evidence of a decision in one pydantic-core call
+EVIDENCE_ADAPTER = TypeAdapter(List[PolicyEvidence])
+
+def validate_evidence(items: Any) -> List[PolicyEvidence]:
+    """Coerce LLM evidence items, dropping the ones that can't be coerced"""
+    if not isinstance(items, list):
+        return []
+    try:
+        return EVIDENCE_ADAPTER.validate_python(items)
+    except ValidationError as e:
+        bad = {err["loc"][0] for err in e.errors() if err["loc"]}
+        return EVIDENCE_ADAPTER.validate_python([it for i, it in enumerate(items) if i not in bad])
@@ -1,7 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import List, Dict, Any
 
 class ValidationResult(BaseModel):
+    model_config = ConfigDict(extra='ignore')
     clause: str
     match: str
     similarity: float
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File
 from app.services.llm import gemini_flash_complete
 from app.services.ocr import extract_text
+from app.services.ingest import save_upload
+import asyncio
 import tempfile
 import os
 
@@ -10,21 +12,21 @@ router = APIRouter()
 async def ai_analyze(file: UploadFile = File(...)):
     """Analyze contract using AI for financial health and risk assessment"""
     try:
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as tmp_file:
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_file_path = tmp_file.name
+        # Save uploaded file temporarily (copied off the event loop, without reading it into memory)
+        fd, tmp_file_path = tempfile.mkstemp(suffix=os.path.splitext(file.filename or "")[1])
+        os.close(fd)
         
         try:
-            # Extract text from the file
-            contract_text = extract_text(tmp_file_path)
+            await save_upload(file, tmp_file_path)
+            # Extract text from the file; OCR blocks, so keep it off the event loop
+            contract_text = await asyncio.to_thread(extract_text, tmp_file_path)
             
             if not contract_text.strip():
                 raise HTTPException(status_code=400, detail="No text could be extracted from the file")
             
             # Analyze using Gemini Flash
-            analysis = gemini_flash_complete(
+            analysis = await asyncio.to_thread(
+                gemini_flash_complete,
                 f"Analyze financial health and risks of this contract:\n{contract_text}",
                 model_id="gemini-2.0-flash-exp"
             )
@@ -47,7 +49,8 @@ async def ai_analyze_text(text: str):
             raise HTTPException(status_code=400, detail="Text cannot be empty")
         
         # Analyze using Gemini Flash
-        analysis = gemini_flash_complete(
+        analysis = await asyncio.to_thread(
+            gemini_flash_complete,
             f"Analyze financial health and risks of this contract text:\n{text}",
             model_id="gemini-2.0-flash-exp"
         )
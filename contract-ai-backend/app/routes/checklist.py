@@ -1,11 +1,13 @@
-from fastapi import APIRouter, HTTPException
-from app.services.embeddings import semantic_search
+from fastapi import APIRouter
+import asyncio
+import itertools
+from app.services.embeddings import semantic_search_batch
 from app.services.llm import gemini_json
 
 router = APIRouter(prefix="/checklist", tags=["checklist"])
 
-# Fixed retrieval size
-RETRIEVAL_K = 12  # internal, no query param exposed
+# Fixed retrieval size per checklist item
+RETRIEVAL_K = 3  # internal, no query param exposed
 
 DEFAULT_ITEMS = [
     {"key": "confidentiality_clause", "label": "Confidentiality / NDA", "weight": 0.15},
@@ -31,47 +33,55 @@ Return only strict JSON:
 }
 """
 
+def _prompt_prefix(items):
+    checklist = "\n".join([f"- {i['key']}: {i['label']}" for i in items])
+    return f"{LLM_INSTRUCTIONS}\n\nChecklist:\n{checklist}\n\nContract excerpts:\n"
+
+# The default checklist never changes, so its prompt header is built once
+_DEFAULT_PROMPT_PREFIX = _prompt_prefix(DEFAULT_ITEMS)
+
 def _flatten_to_strings(nested):
-    """Flatten nested lists into a single list of strings"""
-    flat = []
-    for item in nested:
-        if isinstance(item, str):
-            flat.append(item)
-        elif isinstance(item, (list, tuple)):
-            flat.extend([s for s in item if isinstance(s, str)])
-    return flat
+    """Flatten Chroma's List[List[str]] documents into a single iterable of strings"""
+    if not nested:
+        return iter(())
+    if isinstance(nested[0], str):
+        return iter(nested)
+    return itertools.chain.from_iterable(nested)
 
 def _build_prompt(chunks, items):
-    checklist = "\n".join([f"- {i['key']}: {i['label']}" for i in items])
+    prefix = _DEFAULT_PROMPT_PREFIX if items is DEFAULT_ITEMS else _prompt_prefix(items)
     # Flatten chunks to handle nested lists from semantic_search
-    flat_chunks = _flatten_to_strings(chunks if isinstance(chunks, list) else [])
-    context = "\n\n---\n".join(flat_chunks)
-    return f"{LLM_INSTRUCTIONS}\n\nChecklist:\n{checklist}\n\nContract excerpts:\n{context}"
+    context = "\n\n---\n".join(_flatten_to_strings(chunks if isinstance(chunks, list) else []))
+    return prefix + context
 
 @router.get("/{contract_id}")
-def checklist(contract_id: str):
-    try:
-        # Retrieve representative chunks internally (fixed RETRIEVAL_K)
-        results = semantic_search(query="contract key clauses", top_k=RETRIEVAL_K, contract_id=contract_id)
-        chunks = results["documents"] if results and results.get("documents") else []
-        if not chunks:
-            return {
-                "contract_id": contract_id,
-                "checklist": {},
-                "chunks_analyzed": 0,
-                "overall_risk": 100,
-                "overall_explanation": "No content found for this contract; treat as high risk by default."
-            }
-
-        prompt = _build_prompt(chunks, DEFAULT_ITEMS)
-        analysis = gemini_json(prompt)
-
+async def checklist(contract_id: str):
+    # One targeted query per checklist item, dispatched as a single batched search
+    results = await asyncio.to_thread(
+        semantic_search_batch,
+        [i["label"] for i in DEFAULT_ITEMS],
+        top_k=RETRIEVAL_K,
+        contract_id=contract_id,
+        include=["documents"]
+    )
+    # Items often retrieve the same chunk; keep the first occurrence only
+    chunks = list(dict.fromkeys(_flatten_to_strings(results.get("documents") or [])))
+    if not chunks:
         return {
             "contract_id": contract_id,
-            "checklist": analysis.get("items", {}),
-            "chunks_analyzed": len(chunks),
-            "overall_risk": analysis.get("overall_risk", 50),
-            "overall_explanation": analysis.get("overall_explanation", "Computed from checklist items.")
+            "checklist": {},
+            "chunks_analyzed": 0,
+            "overall_risk": 100,
+            "overall_explanation": "No content found for this contract; treat as high risk by default."
         }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+
+    prompt = _build_prompt(chunks, DEFAULT_ITEMS)
+    analysis = await asyncio.to_thread(gemini_json, prompt)
+
+    return {
+        "contract_id": contract_id,
+        "checklist": analysis.get("items", {}),
+        "chunks_analyzed": len(chunks),
+        "overall_risk": analysis.get("overall_risk", 50),
+        "overall_explanation": analysis.get("overall_explanation", "Computed from checklist items.")
+    }
@@ -1,39 +1,62 @@
 from fastapi import APIRouter, Body, HTTPException, UploadFile, File
+from fastapi.responses import ORJSONResponse
 from typing import List, Dict, Any, Union
-import uuid
+import asyncio
+from app.utils.ids import new_id, new_seq
 import json
+import ijson
+from pydantic import ValidationError
 
 from app.db.vector import chroma_manager  # wrapper over chromadb client (HttpClient/PersistentClient)
-from app.services.embeddings import embed_chunks  # returns List[List[float]]
+from app.services.embeddings import embed_chunks_cached
+from app.models.clause import CLAUSES_IN_ADAPTER
 
 router = APIRouter(tags=["clauses"])
 LIB_COLLECTION = "standard_clauses"
+# Largest standard-document JSON accepted by /upload-standard-document
+MAX_STANDARD_DOC_BYTES = 10 << 20
 
-def _validate_clause(it: Dict[str, Any]):
-    for f in ("title", "category", "text"):
-        if not it.get(f) or not str(it.get(f)).strip():
-            raise HTTPException(status_code=400, detail=f"Missing or empty field: {f}")
-
-def _build_metadata(it: Dict[str, Any], clause_id: str) -> Dict[str, Any]:
-    def scalar(v):
-        # Chroma accepts only str|int|float|bool|None; convert others to JSON strings
-        if isinstance(v, (str, int, float, bool)) or v is None:
-            return v
-        # For lists/dicts, join or json-dump; prefer compact CSV for lists you will filter on
-        if isinstance(v, list):
-            # join as CSV for simple tags; adjust delimiter if needed
-            return ",".join([str(x) for x in v])
+# Metadata fields copied from a clause payload, in storage order
+_META_FIELDS = ("title", "category", "source", "version", "jurisdiction", "tags")
+# Fallbacks for clauses uploaded via a standard document
+_STD_DOC_DEFAULTS = {"title": "", "category": "", "source": "STD-DOC", "version": "", "jurisdiction": "", "tags": ""}
+
+def _scalar(v: Any) -> Any:
+    # Chroma accepts only str|int|float|bool|None; convert others to strings
+    if v is None or isinstance(v, (str, int, float, bool)):
+        return v
+    if isinstance(v, list):
+        # join as CSV for simple tags you will filter on, e.g. "delaware,venue"
+        return ",".join(map(str, v))
+    try:
         return json.dumps(v, ensure_ascii=False)
+    except Exception:
+        return str(v)
 
-    return {
-        "clause_id": clause_id,
-        "title": scalar(it.get("title")),
-        "category": scalar(it.get("category")),
-        "source": scalar(it.get("source")),
-        "version": scalar(it.get("version")),
-        "jurisdiction": scalar(it.get("jurisdiction")),
-        "tags": scalar(it.get("tags")),  # list -> "delaware,venue"
-    }
+class _CappedReader:
+    """Async reader over an upload that raises 413 once more than `limit` bytes have been read"""
+
+    def __init__(self, f: UploadFile, limit: int):
+        self._f = f
+        self._limit = limit
+        self._read = 0
+
+    async def read(self, size: int = -1) -> bytes:
+        data = await self._f.read(size)
+        self._read += len(data)
+        if self._read > self._limit:
+            raise HTTPException(status_code=413, detail=f"File exceeds {self._limit >> 20} MB limit")
+        return data
+
+def _build_metadata(it: Dict[str, Any], clause_id: str, defaults: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    md = {"clause_id": clause_id}
+    get = it.get
+    for f in _META_FIELDS:
+        v = get(f)
+        if not v and defaults is not None:
+            v = defaults[f]
+        md[f] = _scalar(v)
+    return md
 
 @router.post("/upload-json")
 def upload_standard_clauses(payload: Union[Dict[str, Any], List[Dict[str, Any]]] = Body(..., embed=False)):
@@ -48,25 +71,22 @@ def upload_standard_clauses(payload: Union[Dict[str, Any], List[Dict[str, Any]]]
     if not items:
         raise HTTPException(status_code=400, detail="Empty JSON")
 
-    texts = [it["text"] for it in items]
-    # Validate and prepare
-    for it in items:
-        _validate_clause(it)
-
-    ids = [it.get("clause_id") or str(uuid.uuid4()) for it in items]
-    metadatas = [_build_metadata(it, ids[i]) for i, it in enumerate(items)]
+    # Validate the whole batch in one call; _build_metadata only ever emits scalar values
+    try:
+        items = [c.model_dump() for c in CLAUSES_IN_ADAPTER.validate_python(items)]
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
 
-    # Pre-check metadata for scalar values
+    texts = [it["text"] for it in items]
+    ids = [it.get("clause_id") or new_id() for it in items]
+    metadatas = [_build_metadata(it, cid) for it, cid in zip(items, ids)]
     for md in metadatas:
-        for k, v in md.items():
-            if not isinstance(v, (str, int, float, bool)) and v is not None:
-                raise HTTPException(status_code=400, detail=f"Metadata field '{k}' must be scalar; got {type(v).__name__}")
+        md["seq"] = new_seq()
 
     # Embed and add to Chroma collection
     try:
-        embs = embed_chunks(texts)
-        chroma_manager.get_or_create_collection(LIB_COLLECTION)  # idempotent
-        chroma_manager.add_documents(
+        embs = embed_chunks_cached(texts)
+        chroma_manager.add_documents_batched(
             documents=texts,
             embeddings=embs,
             metadatas=metadatas,
@@ -79,22 +99,38 @@ def upload_standard_clauses(payload: Union[Dict[str, Any], List[Dict[str, Any]]]
     return {"status": "stored", "collection": LIB_COLLECTION, "count": len(ids), "ids": ids}
 
 @router.get("/")
-def list_clauses(category: str | None = None, limit: int = 100, offset: int = 0):
+async def list_clauses(category: str | None = None, limit: int = 100, offset: int = 0, after_id: str | None = None):
     where = {"category": category} if category else None
-    res = chroma_manager.get_documents(collection_name=LIB_COLLECTION, include=["ids", "documents", "metadatas"], where=where, limit=limit, offset=offset)
+    if after_id:
+        # Cursor pagination: pass the last clause_id of the previous page
+        try:
+            res = await asyncio.to_thread(chroma_manager.get_documents_after, after_id, collection_name=LIB_COLLECTION, include=["documents", "metadatas"], where=where, limit=limit)
+        except KeyError:
+            raise HTTPException(status_code=400, detail=f"Unknown after_id cursor: {after_id}")
+    elif offset:
+        # Legacy offset pagination (storage order)
+        res = await asyncio.to_thread(chroma_manager.get_documents, collection_name=LIB_COLLECTION, include=["documents", "metadatas"], where=where, limit=limit, offset=offset)
+    else:
+        # First page in the same seq order the cursor pages follow
+        res = await asyncio.to_thread(chroma_manager.get_documents_page, collection_name=LIB_COLLECTION, include=["documents", "metadatas"], where=where, limit=limit)
 
-    out = []
     docs = res.get("documents") or []
     metas = res.get("metadatas") or []
     ids = res.get("ids") or []
-    for doc, md, id_ in zip(docs, metas, ids):
-        out.append({"clause_id": id_, "title": (md or {}).get("title") or "", "category": (md or {}).get("category") or "", "text": doc})
-    return {"count": len(out), "clauses": out}
+    out = [
+        {"clause_id": id_, "title": (md or {}).get("title") or "", "category": (md or {}).get("category") or "", "text": doc}
+        for doc, md, id_ in zip(docs, metas, ids)
+    ]
+    # A cursor is only issued for a row that has a seq to continue from
+    last_md = (metas[len(out) - 1] or {}) if out else {}
+    has_more = len(out) == limit and isinstance(last_md.get("seq"), int)
+    # Serialize with orjson directly; skips FastAPI's jsonable_encoder pass over every clause
+    return ORJSONResponse({"count": len(out), "clauses": out, "next_after": out[-1]["clause_id"] if has_more else None})
 
 @router.put("/{clause_id}")
 def update_clause(clause_id: str, payload: Dict[str, Any] = Body(...)):
     docs = [payload["text"]] if payload.get("text") else None
-    embs = embed_chunks([payload["text"]]) if payload.get("text") else None
+    embs = embed_chunks_cached([payload["text"]]) if payload.get("text") else None
     md = _build_metadata(payload, clause_id)
     chroma_manager.update_documents(
         collection_name=LIB_COLLECTION,
@@ -110,30 +146,6 @@ def delete_clause(clause_id: str):
     chroma_manager.delete_documents(collection_name=LIB_COLLECTION, ids=[clause_id])
     return {"status": "deleted", "clause_id": clause_id}
 
-def _normalize_scalar(v: Any) -> Any:
-    # Chroma metadata must be str|int|float|bool|None
-    if isinstance(v, (str, int, float, bool)) or v is None:
-        return v
-    if isinstance(v, list):
-        # keep a simple CSV string for readability
-        return ",".join(str(x) for x in v)
-    try:
-        return json.dumps(v, ensure_ascii=False)
-    except Exception:
-        return str(v)
-
-def _mk_metadata(it: Dict[str, Any], clause_id: str) -> Dict[str, Any]:
-    # keep minimal, scalar-safe metadata
-    return {
-        "clause_id": clause_id,
-        "title": _normalize_scalar(it.get("title") or ""),
-        "category": _normalize_scalar(it.get("category") or ""),
-        "version": _normalize_scalar(it.get("version") or ""),
-        "jurisdiction": _normalize_scalar(it.get("jurisdiction") or ""),
-        "source": _normalize_scalar(it.get("source") or "STD-DOC"),
-        "tags": _normalize_scalar(it.get("tags") or []),
-    }
-
 @router.post("/upload-standard-document")
 async def upload_standard_document(file: UploadFile = File(...)):
     """
@@ -143,40 +155,46 @@ async def upload_standard_document(file: UploadFile = File(...)):
     Only 'text' fields are embedded and stored as Chroma documents.
     Minimal scalar metadata (title, category, clause_id, etc.) is stored for filtering.
     """
-    content = await file.read()
-    try:
-        document = json.loads(content)
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=400, detail="Invalid JSON file")
+    head = (await file.read(64)).lstrip()
+    await file.seek(0)
+    if head.startswith(b"["):
+        # Clause libraries are parsed item by item off the upload; the raw file is never held in
+        # memory, and the same size cap as a single object applies while reading
+        capped = _CappedReader(file, MAX_STANDARD_DOC_BYTES)
+        try:
+            items: List[Dict[str, Any]] = [it async for it in ijson.items_async(capped, "item", use_float=True)]
+        except ijson.JSONError:
+            raise HTTPException(status_code=400, detail="Invalid JSON file")
+    else:
+        # Single clause object: read in bounded chunks so an oversized upload is rejected early
+        buf = bytearray()
+        while chunk := await file.read(1 << 20):
+            buf += chunk
+            if len(buf) > MAX_STANDARD_DOC_BYTES:
+                raise HTTPException(status_code=413, detail=f"File exceeds {MAX_STANDARD_DOC_BYTES >> 20} MB limit")
+        try:
+            document = json.loads(bytes(buf))
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid JSON file")
+        items = document if isinstance(document, list) else [document]
 
-    items: List[Dict[str, Any]] = document if isinstance(document, list) else [document]
     if not items:
         raise HTTPException(status_code=400, detail="Empty JSON")
 
-    # Validate and gather texts
-    texts: List[str] = []
-    ids: List[str] = []
-    metadatas: List[Dict[str, Any]] = []
-
-    for it in items:
-        title = (it.get("title") or "").strip()
-        category = (it.get("category") or "").strip()
-        text = (it.get("text") or "").strip()
-        if not text:
-            raise HTTPException(status_code=400, detail="Each clause must include non-empty 'text'")
-        if not title or not category:
-            # still allow, but warn via metadata
-            pass
-        clause_id = str(it.get("clause_id") or uuid.uuid4())
-        ids.append(clause_id)
-        texts.append(text)
-        metadatas.append(_mk_metadata(it, clause_id))
+    # Validate and gather texts; missing title/category is allowed (empty metadata)
+    texts: List[str] = [(it.get("text") or "").strip() for it in items]
+    if not all(texts):
+        raise HTTPException(status_code=400, detail="Each clause must include non-empty 'text'")
+    ids: List[str] = [str(it.get("clause_id") or new_id()) for it in items]
+    metadatas: List[Dict[str, Any]] = [_build_metadata(it, cid, _STD_DOC_DEFAULTS) for it, cid in zip(items, ids)]
+    for md in metadatas:
+        md["seq"] = new_seq()
 
     # Embed and add to Chroma; store ONLY the text as document
     try:
-        chroma_manager.get_or_create_collection(LIB_COLLECTION)
-        embeddings = embed_chunks(texts)
-        chroma_manager.add_documents(
+        embeddings = await asyncio.to_thread(embed_chunks_cached, texts)
+        await asyncio.to_thread(
+            chroma_manager.add_documents_batched,
             collection_name=LIB_COLLECTION,
             documents=texts,         # text only
             embeddings=embeddings,   # vectors of texts
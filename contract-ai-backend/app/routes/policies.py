@@ -1,9 +1,20 @@
-from fastapi import APIRouter, HTTPException, Body
-from typing import List, Dict, Any
-from app.services.embeddings import semantic_search
+from fastapi import APIRouter, HTTPException, Body, BackgroundTasks
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from app.services.embeddings import semantic_search_batch, split_batch_results, SearchResult
 from app.services.llm import gemini_json, LLMJsonError
-import traceback
+from app.services import semantic_cache
+from app.models.policy import validate_evidence
+from app.utils.ids import new_id
 import boto3
+from botocore.config import Config as BotoConfig
+from botocore.exceptions import ClientError
 try:
     import fitz  # PyMuPDF
     HAVE_FITZ = hasattr(fitz, "open")
@@ -13,13 +24,39 @@ except Exception:
 
 router = APIRouter(prefix="/policies", tags=["policies"])
 
+if HAVE_FITZ:
+    _SEARCH_FLAGS = fitz.TEXT_DEHYPHENATE | fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_PRESERVE_WHITESPACE
+
 # Retrieval
 EACH_POLICY_K = 6
 MAX_CONTEXT_CHARS = 8000
 
+# Policies evaluated (Gemini requests in flight) at once per request
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+
+# Cosine distance above which even the best retrieved chunk is too weak a match to send to the LLM
+GATE_THRESHOLD = float(os.getenv("POLICY_GATE_DISTANCE", "0.65"))
+
 # S3
 S3_BUCKET = "exo-cat"
-s3_client = boto3.client("s3", region_name="ap-south-1")
+# One pooled client for all requests: enough connections for concurrent downloads/uploads,
+# kept alive so repeated transfers skip the TCP/TLS handshake
+s3_client = boto3.client(
+    "s3",
+    region_name="ap-south-1",
+    config=BotoConfig(
+        max_pool_connections=int(os.getenv("S3_MAX_POOL_CONNECTIONS", "64")),
+        tcp_keepalive=True,
+        s3={"addressing_style": "virtual"},
+        retries={"mode": "adaptive", "total_max_attempts": 3}
+    )
+)
+
+# Source PDFs already downloaded, by contract_id -> (S3 ETag, local temp path); re-checks of an
+# unchanged contract skip the download
+PDF_CACHE_SIZE = 32
+_pdf_cache: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+_pdf_cache_lock = threading.Lock()
 
 VIOLATION_SYSTEM = """
 You are a senior contracts compliance analyst.
@@ -32,42 +69,48 @@ If not violated, set violated=false and risk near 0 with rationale.
 Return spans as character offsets relative to the provided chunk text.
 """
 
-# ---------- Prompt builder ----------
-def build_policy_prompt(rule: str, evidences: List[Dict[str, Any]]) -> str:
-    blocks, total = [], 0
-    for ev in evidences:
-        idx = ev.get("chunk_index")
-        text = ev.get("text", "")
-        remain = MAX_CONTEXT_CHARS - total
-        if remain <= 0:
-            break
-        snippet = text[:remain]
-        total += len(snippet)
-        blocks.append(f"[chunk_index={idx}]\n{snippet}")
-    context = "\n\n---\n\n".join(blocks)
-
-    return f"""{VIOLATION_SYSTEM}
+# Constant parts of the policy prompt, built once; only the rule and excerpts vary per call
+_PROMPT_PREFIX = f"""{VIOLATION_SYSTEM}
 
 POLICY RULE:
-{rule}
+"""
+_PROMPT_EXCERPTS = """
 
 CONTRACT EXCERPTS:
-{context}
+"""
+_PROMPT_SUFFIX = """
 
 Output strict JSON:
-{{
+{
   "violated": bool,
   "risk": int,
   "explanation": str,
   "evidence": [
-    {{
+    {
       "chunk_index": int,
       "quote": str,
-      "span": {{"start": int, "end": int}}
-    }}
+      "span": {"start": int, "end": int}
+    }
   ]
-}}
+}
 """
+
+# ---------- Prompt builder ----------
+def build_policy_prompt(rule: str, evidences: List[Dict[str, Any]]) -> str:
+    # Single-pass writer; evidence text is only sliced when it has to be truncated
+    buf, total = io.StringIO(), 0
+    for ev in evidences:
+        remain = MAX_CONTEXT_CHARS - total
+        if remain <= 0:
+            break
+        text = ev.get("text", "")
+        if buf.tell():
+            buf.write("\n\n---\n\n")
+        buf.write(f"[chunk_index={ev.get('chunk_index')}]\n")
+        buf.write(text if len(text) <= remain else text[:remain])
+        total += min(len(text), remain)
+
+    return "".join((_PROMPT_PREFIX, rule, _PROMPT_EXCERPTS, buf.getvalue(), _PROMPT_SUFFIX))
 def auto_violation(contract_text: str):
     """
     Dummy implementation of auto_violation.
@@ -91,29 +134,182 @@ def weighted_overall(violations: List[Dict[str, Any]]) -> int:
 def highlight_pdf(pdf_path: str, violations: list, output_path: str):
     if not HAVE_FITZ:
         # If fitz is not available, just copy the file without highlighting
-        import shutil
         shutil.copy(pdf_path, output_path)
         return output_path
 
-    doc = fitz.open(pdf_path)
+    # Each distinct quote is searched once, however many violations cite it; quotes that only
+    # differ in case or whitespace count as the same (search_for ignores both anyway)
+    unique = {}
     for v in violations:
         if not v.get("violated"):
             continue
         for ev in v.get("evidence", []):
             quote = ev.get("quote", "").strip()
-            if not quote:
+            if quote:
+                unique.setdefault(" ".join(quote.split()).lower(), quote)
+    normalized = [(quote, needle) for needle, quote in unique.items()]
+
+    doc = fitz.open(pdf_path)
+    for page in doc:
+        # Read the page text once (same dehyphenation as search_for) and only run the
+        # layout search for quotes that actually occur on this page
+        page_text = " ".join(page.get_text("text", flags=_SEARCH_FLAGS).split()).lower()
+        for quote, needle in normalized:
+            if needle not in page_text:
                 continue
-            for page in doc:
-                areas = page.search_for(quote)
-                for area in areas:
-                    annot = page.add_highlight_annot(area)
-                    annot.update()
+            for area in page.search_for(quote):
+                annot = page.add_highlight_annot(area)
+                annot.update()
     doc.save(output_path)
     return output_path
 
+# ---------- Per-policy evaluation ----------
+def _coerce_pol(pol: Dict[str, Any]) -> Tuple[str, str, Optional[str]]:
+    """(policy_id, title, rule) of a request policy, with the accepted aliases resolved once"""
+    pid = pol.get("id") or pol.get("policy_id") or "POLICY"
+    return pid, pol.get("title") or pid, pol.get("rule") or pol.get("description")
+
+def _eval_policy(pid: str, title: str, rule: Optional[str], contract_id: str, sr: SearchResult) -> Dict[str, Any]:
+    """Ask the LLM for a decision on one policy given its retrieved chunks (blocking)"""
+    if not rule:
+        return {
+            "policy_id": pid, "title": title, "violated": False,
+            "risk": 0, "explanation": "No rule provided", "evidence": []
+        }
+    if sr.distances and min(sr.distances) > GATE_THRESHOLD:
+        return {
+            "policy_id": pid, "title": title, "violated": False,
+            "risk": 0, "explanation": "No relevant evidence above threshold", "evidence": []
+        }
+
+    evidences = []
+    metadatas = sr.metadatas
+    for i, text in enumerate(sr.chunks):
+        md = (metadatas[i] if i < len(metadatas) else None) or {}
+        evidences.append({
+            "chunk_index": md.get("chunk_index", i),
+            "text": text or ""
+        })
+
+    # The same rule over the same evidence (indices and text, so a re-chunked contract
+    # doesn't hit stale entries) reuses the earlier decision
+    cache_scope = "\x00".join([contract_id] + [f"{ev['chunk_index']}\x01{ev['text']}" for ev in evidences])
+    decision = semantic_cache.get(cache_scope, rule)
+    if decision is None:
+        prompt = build_policy_prompt(rule, evidences)
+        decision = gemini_json(prompt)
+        semantic_cache.put(cache_scope, rule, decision)
+
+    if decision.get("violated", False) and not decision.get("evidence"):
+        if evidences:
+            best_ev = evidences[0]
+            snippet = best_ev.get("text", "")[:500]
+            decision["evidence"] = [{
+                "chunk_index": best_ev.get("chunk_index", 0),
+                "quote": snippet,
+                "span": {"start": 0, "end": len(snippet)}
+            }]
+
+    # One schema validation per decision; items that can't be coerced are dropped
+    ev_out = [ev.model_dump() for ev in validate_evidence(decision.get("evidence", []))]
+
+    return {
+        "policy_id": pid,
+        "title": title,
+        "violated": bool(decision.get("violated", False)),
+        "risk": int(decision.get("risk", 0)),
+        "explanation": str(decision.get("explanation", ""))[:1000],
+        "evidence": ev_out
+    }
+
+# ---------- Source PDF ----------
+def _source_etag(s3_key: str) -> str:
+    """ETag of the contract PDF in S3 (blocking); 404 if it doesn't exist"""
+    try:
+        return s3_client.head_object(Bucket=S3_BUCKET, Key=s3_key)["ETag"]
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            raise HTTPException(status_code=404, detail=f"Source PDF not found: {s3_key}")
+        raise
+
+def _discard(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+def _checkout(path: str) -> str:
+    """Request-private name for a cached PDF; hold _pdf_cache_lock while path is in the cache"""
+    private = f"{path}.{new_id()}.pdf"
+    try:
+        os.link(path, private)
+    except OSError:
+        # Filesystems without hard links get a copy
+        shutil.copyfile(path, private)
+    return private
+
+def _fetch_source_pdf(contract_id: str, s3_key: str, etag: str) -> str:
+    """
+    Private copy of the contract PDF, downloaded unless the cached one matches etag (blocking)
+
+    The returned path is a hard link (or copy) owned by the caller, who deletes it; evicting or
+    replacing the cache entry only unlinks the cache's own name, so it never pulls the file out
+    from under a request that hasn't opened it yet.
+    """
+    with _pdf_cache_lock:
+        cached = _pdf_cache.get(contract_id)
+        if cached is not None and cached[0] == etag and os.path.exists(cached[1]):
+            _pdf_cache.move_to_end(contract_id)
+            return _checkout(cached[1])
+    # Each download gets its own file, so concurrent requests never write over each other
+    fd, local_path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    try:
+        s3_client.download_file(S3_BUCKET, s3_key, local_path)
+    except BaseException:
+        _discard(local_path)
+        raise
+    with _pdf_cache_lock:
+        private = _checkout(local_path)
+        old = _pdf_cache.get(contract_id)
+        stale = [old[1]] if old is not None else []
+        _pdf_cache[contract_id] = (etag, local_path)
+        _pdf_cache.move_to_end(contract_id)
+        while len(_pdf_cache) > PDF_CACHE_SIZE:
+            stale.append(_pdf_cache.popitem(last=False)[1][1])
+    for path in stale:
+        _discard(path)
+    return private
+
+def _discard_fetched(task: "asyncio.Task") -> None:
+    if not task.cancelled() and task.exception() is None:
+        _discard(task.result())
+
+async def _prefetch_source_pdf(head: "asyncio.Task", contract_id: str, s3_key: str) -> str:
+    etag = await head
+    return await asyncio.to_thread(_fetch_source_pdf, contract_id, s3_key, etag)
+
+# ---------- Highlight + upload (after the response) ----------
+async def _highlight_and_upload(download: "asyncio.Task", violations: List[Dict[str, Any]],
+                                s3_key_highlighted: str) -> None:
+    """Wait for the source PDF, highlight the evidence and publish it; errors are only logged"""
+    fd, highlighted_path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    local_path = None
+    try:
+        local_path = await download
+        await asyncio.to_thread(highlight_pdf, local_path, violations, highlighted_path)
+        await asyncio.to_thread(s3_client.upload_file, highlighted_path, S3_BUCKET, s3_key_highlighted)
+    except Exception as e:
+        print(f"⚠️ Could not publish highlighted PDF {s3_key_highlighted}: {e}")
+    finally:
+        _discard(highlighted_path)
+        if local_path is not None:
+            _discard(local_path)
+
 # ---------- Main API ----------
 @router.post("/violation")
-def check_policy_violation(payload: Dict[str, Any] = Body(...)):
+async def check_policy_violation(background_tasks: BackgroundTasks, payload: Dict[str, Any] = Body(...)):
     try:
         contract_id = payload.get("contract_id")
         policies = payload.get("policies") or []
@@ -122,79 +318,52 @@ def check_policy_violation(payload: Dict[str, Any] = Body(...)):
         if not isinstance(policies, list) or not policies:
             raise HTTPException(status_code=400, detail="policies must be a non-empty list")
 
-        out = []
-        for pol in policies:
-            pid = pol.get("id") or pol.get("policy_id") or "POLICY"
-            title = pol.get("title") or pid
-            rule = pol.get("rule") or pol.get("description")
-            if not rule:
-                out.append({
-                    "policy_id": pid, "title": title, "violated": False,
-                    "risk": 0, "explanation": "No rule provided", "evidence": []
-                })
-                continue
+        # S3 locations of the source and highlighted PDFs
+        s3_key = f"contracts/{contract_id}.pdf"
+        s3_key_highlighted = f"contracts/{contract_id}_highlighted.pdf"
+
+        # Retrieve evidence for every rule with one batched encode and one vector query
+        coerced = [_coerce_pol(pol) for pol in policies]
+        queries = [rule for _, _, rule in coerced if rule]
+        hits = await asyncio.to_thread(
+            semantic_search_batch, queries, top_k=EACH_POLICY_K, contract_id=contract_id
+        ) if queries else {}
+        found = iter(split_batch_results(hits, len(queries)))
+        empty = SearchResult([], [], [])
+        retrieved = [next(found) if rule else empty for _, _, rule in coerced]
 
-            results = semantic_search(query=rule, top_k=EACH_POLICY_K, contract_id=contract_id)
-            documents = results.get("documents", [[]])
-            metadatas = results.get("metadatas", [[]])
-            chunks = documents[0] if documents else []
-            metadata_list = metadatas[0] if metadatas else []
-
-            evidences = []
-            for i, text in enumerate(chunks):
-                md = metadata_list[i] if i < len(metadata_list) else {}
-                evidences.append({
-                    "chunk_index": md.get("chunk_index", i),
-                    "text": text or ""
-                })
-
-            prompt = build_policy_prompt(rule, evidences)
-            decision = gemini_json(prompt)
-
-            if decision.get("violated", False) and not decision.get("evidence"):
-                if evidences:
-                    best_ev = evidences[0]
-                    snippet = best_ev.get("text", "")[:500]
-                    decision["evidence"] = [{
-                        "chunk_index": best_ev.get("chunk_index", 0),
-                        "quote": snippet,
-                        "span": {"start": 0, "end": len(snippet)}
-                    }]
-
-            ev_out = []
-            for ev in decision.get("evidence", []):
-                try:
-                    ev_out.append({
-                        "chunk_index": int(ev.get("chunk_index")),
-                        "quote": str(ev.get("quote", ""))[:1000],
-                        "span": {
-                            "start": max(0, int(ev.get("span", {}).get("start", 0))),
-                            "end": max(0, int(ev.get("span", {}).get("end", 0)))
-                        }
-                    })
-                except Exception:
-                    continue
-
-            out.append({
-                "policy_id": pid,
-                "title": title,
-                "violated": bool(decision.get("violated", False)),
-                "risk": int(decision.get("risk", 0)),
-                "explanation": str(decision.get("explanation", ""))[:1000],
-                "evidence": ev_out
-            })
+        # Gemini calls are independent and network-bound: evaluate policies concurrently,
+        # capped to stay inside provider rate limits
+        sem = asyncio.Semaphore(LLM_CONCURRENCY)
+
+        async def run(pid: str, title: str, rule: Optional[str], sr: SearchResult) -> Dict[str, Any]:
+            async with sem:
+                return await asyncio.to_thread(_eval_policy, pid, title, rule, contract_id, sr)
+
+        # The source PDF is only needed for highlighting; check and fetch it while policies
+        # are evaluated
+        head = asyncio.create_task(asyncio.to_thread(_source_etag, s3_key))
+        download = asyncio.create_task(_prefetch_source_pdf(head, contract_id, s3_key))
+        # Its failure is reported through head (or logged by the highlight task)
+        download.add_done_callback(lambda t: t.cancelled() or t.exception())
+        try:
+            out = list(await asyncio.gather(*(run(*pol, sr) for pol, sr in zip(coerced, retrieved))))
+        except BaseException:
+            # A fetch already running in its thread still completes; drop its private copy
+            download.add_done_callback(_discard_fetched)
+            head.cancel()
+            raise
 
         overall = weighted_overall(out)
 
-        # ==== Highlight + Upload to S3 ====
-        local_path = f"/tmp/{contract_id}.pdf"
-        highlighted_path = f"/tmp/{contract_id}_highlighted.pdf"
-        s3_key = f"contracts/{contract_id}.pdf"
-        s3_key_highlighted = f"contracts/{contract_id}_highlighted.pdf"
+        # A missing source PDF still fails the request rather than returning a URL that
+        # will never exist
+        await head
 
-        s3_client.download_file(S3_BUCKET, s3_key, local_path)
-        highlight_pdf(local_path, out, highlighted_path)
-        s3_client.upload_file(highlighted_path, S3_BUCKET, s3_key_highlighted)
+        # ==== Highlight + Upload to S3 ====
+        # Runs after the response is sent; the URL is deterministic, so clients can poll it
+        # (e.g. HEAD) until the highlighted PDF appears
+        background_tasks.add_task(_highlight_and_upload, download, out, s3_key_highlighted)
 
         highlighted_url = f"https://{S3_BUCKET}.s3.ap-south-1.amazonaws.com/{s3_key_highlighted}"
 
@@ -203,12 +372,11 @@ def check_policy_violation(payload: Dict[str, Any] = Body(...)):
             "overall_risk": overall,
             "overall_explanation": "Average of risks for violated policies.",
             "violations": out,
-            "highlighted_pdf_url": highlighted_url
+            "highlighted_pdf_url": highlighted_url,
+            "highlight_status": "pending"
         }
 
     except HTTPException:
         raise
     except LLMJsonError as e:
         raise HTTPException(status_code=500, detail=f"LLM JSON parsing error: {str(e)}")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"{e}\n{traceback.format_exc()}")
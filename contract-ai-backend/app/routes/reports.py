@@ -1,6 +1,6 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter
 from typing import Dict, List
-from app.db.mongo import get_clauses
+from app.db.mongo import iter_clauses, count_clauses
 from app.db.vector import get_collection_info
 
 router = APIRouter()
@@ -8,42 +8,34 @@ router = APIRouter()
 @router.get("/summary")
 def get_system_summary():
     """Get system summary and statistics"""
+    total_clauses = count_clauses()
+    
+    # Get collection info
     try:
-        clauses = get_clauses()
-        
-        # Get collection info
-        try:
-            collection_info = get_collection_info()
-            vector_count = collection_info.points_count
-        except:
-            vector_count = 0
-        
-        return {
-            "total_clauses": len(clauses),
-            "total_vectors": vector_count,
-            "system_status": "operational"
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error: {e}")
+        # ChromaDB reports the collection size under "count"
+        vector_count = get_collection_info()["count"]
+    except Exception:
+        vector_count = 0
+    
+    return {
+        "total_clauses": total_clauses,
+        "total_vectors": vector_count,
+        "system_status": "operational"
+    }
 
 @router.get("/clause-analysis")
 def get_clause_analysis():
     """Get analysis of clause library"""
-    try:
-        clauses = get_clauses()
-        
-        # Basic analysis
-        categories = {}
-        for clause in clauses:
-            category = clause.get("category", "uncategorized")
-            if category not in categories:
-                categories[category] = 0
-            categories[category] += 1
-        
-        return {
-            "total_clauses": len(clauses),
-            "categories": categories,
-            "clauses": [{"id": str(c["_id"]), "title": c["title"], "category": c["category"]} for c in clauses]
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error: {e}")
+    # Only the listed fields are fetched; clause text stays on the server
+    categories = {}
+    clauses = []
+    for c in iter_clauses(projection={"title": 1, "category": 1}):
+        category = c.get("category", "uncategorized")
+        categories[category] = categories.get(category, 0) + 1
+        clauses.append({"id": str(c["_id"]), "title": c["title"], "category": c["category"]})
+    
+    return {
+        "total_clauses": len(clauses),
+        "categories": categories,
+        "clauses": clauses
+    }
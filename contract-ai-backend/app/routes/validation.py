@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Body, HTTPException
 from typing import Dict, Any
 from datetime import datetime
-from app.services.embeddings import embed_chunks
+from functools import lru_cache
+import threading
+from app.services.embeddings import embed_chunks_cached
 from app.db.vector import chroma_manager
 from app.services.llm import generate_recommendation
 
@@ -40,17 +42,35 @@ CLAUSE_LIBRARY = [
     },
 ]
 
+# CLAUSE_LIBRARY queries never change: encode them once per process, on first use so
+# importing the module doesn't wait for the model
+_query_vecs = None
+_query_vecs_lock = threading.Lock()
+
+
+def clause_query_vecs():
+    """Embeddings of the CLAUSE_LIBRARY queries, in library order (computed once)"""
+    global _query_vecs
+    if _query_vecs is None:
+        with _query_vecs_lock:
+            if _query_vecs is None:
+                _query_vecs = embed_chunks_cached([clause["query"] for clause in CLAUSE_LIBRARY])
+    return _query_vecs
+
+
+@lru_cache(maxsize=256)
+def _query_keywords(query: str) -> tuple:
+    """Keywords of a clause query (split once per distinct query)"""
+    return tuple(query.split())
+
 
 def compliance_score(match_text: str, query: str) -> int:
     """Very simple scoring based on keyword hits."""
     if not match_text:
         return 0
     text = match_text.lower()
-    score = 0
-    for kw in query.split():
-        if kw in text:
-            score += 20
-    return min(100, score)
+    hits = sum(1 for kw in _query_keywords(query) if kw in text)
+    return min(100, 20 * hits)
 
 
 def risk_level_from_score(score: int) -> str:
@@ -72,7 +92,16 @@ def validate_contract(payload: Dict[str, Any] = Body(...)):
         clauses_out, risks_out, violations_out = [], [], []
         total_compliance = 0
 
-        for clause in CLAUSE_LIBRARY:
+        # One vector query for every clause, using the precomputed query embeddings
+        print(f"🔍 Searching vector DB for {len(CLAUSE_LIBRARY)} clause queries")
+        batch = chroma_manager.search_similar_batch(
+            query_embeddings=clause_query_vecs(), top_k=1, collection_name="contracts",
+            include=["documents", "metadatas"]
+        )
+        batch_docs = batch.get("documents") or []
+        batch_metas = batch.get("metadatas") or []
+
+        for qi, clause in enumerate(CLAUSE_LIBRARY):
             cid, cname, query, checklist = (
                 clause["id"],
                 clause["name"],
@@ -81,17 +110,12 @@ def validate_contract(payload: Dict[str, Any] = Body(...)):
             )
 
             print(f"🔍 Processing clause: {cname} (ID={cid})")
-            print(f"   ↳ Searching in vector DB with query: {query}")
-
-            # Search in chroma db
-            vec = embed_chunks([query])[0]
-            res = chroma_manager.search_similar(
-                query_embedding=vec, top_k=1, collection_name="contracts"
-            )
 
-            if res and res.get("documents") and res["documents"][0]:
-                match_text = res["documents"][0][0]
-                metadata = res.get("metadatas", [[{}]])[0][0]
+            docs = batch_docs[qi] if qi < len(batch_docs) else []
+            metas = batch_metas[qi] if qi < len(batch_metas) else []
+            if docs:
+                match_text = docs[0]
+                metadata = (metas[0] if metas else None) or {}
                 page_number = metadata.get("page_number")
                 score = compliance_score(match_text, query)
                 status = "present" if score > 0 else "missing"
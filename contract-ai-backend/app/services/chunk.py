@@ -1,35 +1,55 @@
 import re
 
+_SENTENCE_SPLIT = re.compile(r'(?<=[\.\?\!])\s+')
+
+def _iter_sentences(text):
+    """Sentences of text, same as _SENTENCE_SPLIT.split(text) but yielded one at a time"""
+    start = 0
+    for m in _SENTENCE_SPLIT.finditer(text):
+        yield text[start:m.start()]
+        start = m.end()
+    yield text[start:]
+
 def chunk_text(text, max_length=1200, overlap=120):
     """
     Split text into overlapping chunks for better processing
-    
+
     Args:
         text: Input text to chunk
         max_length: Maximum characters per chunk
         overlap: Number of characters to overlap between chunks
-    
+
     Returns:
         List of text chunks
     """
-    # Split into sentences using regex
-    sentences = re.split(r'(?<=[\.\?\!])\s+', text.strip())
-    
+    # Stream sentences instead of materializing the whole list up front
+    sentences = _iter_sentences(text.strip())
+
     chunks = []
-    current_chunk = ""
-    
+    # Pieces of the current chunk, joined by single spaces only when a chunk is emitted;
+    # current_len tracks the length of that joined string without building it
+    pieces = []
+    current_len = 0
+
     for sentence in sentences:
-        if len(current_chunk) + len(sentence) < max_length:
-            current_chunk += (" " if current_chunk else "") + sentence
+        if current_len + len(sentence) < max_length:
+            if current_len:
+                current_len += 1
+            pieces.append(sentence)
+            current_len += len(sentence)
         else:
-            if current_chunk.strip():
-                chunks.append(current_chunk.strip())
+            current_chunk = " ".join(pieces)
+            stripped = current_chunk.strip()
+            if stripped:
+                chunks.append(stripped)
             # Start new chunk with overlap from previous
             overlap_text = current_chunk[-overlap:] if len(current_chunk) > overlap else current_chunk
-            current_chunk = overlap_text + " " + sentence
-    
+            pieces = [overlap_text, sentence]
+            current_len = len(overlap_text) + 1 + len(sentence)
+
     # Add remaining chunk
-    if current_chunk.strip():
-        chunks.append(current_chunk.strip())
-    
+    current_chunk = " ".join(pieces).strip()
+    if current_chunk:
+        chunks.append(current_chunk)
+
     return chunks
@@ -1,5 +1,5 @@
 from typing import Dict, List, Optional
-from app.db.mongo import save_clause, get_clauses, get_clause_by_id
+from app.db.mongo import save_clause, save_clauses_bulk, get_clauses, get_clause_by_id
 from bson import ObjectId
 
 class ClauseLibrary:
@@ -11,6 +11,12 @@ class ClauseLibrary:
         result = save_clause(clause)
         return str(result.inserted_id)
     
+    @staticmethod
+    def add_clauses(clauses: List[Dict]) -> List[str]:
+        """Add many clauses to the library in a single bulk insert"""
+        result = save_clauses_bulk(clauses)
+        return [str(i) for i in result.inserted_ids] if result else []
+    
     @staticmethod
     def get_all_clauses() -> List[Dict]:
         """Get all clauses from the library"""
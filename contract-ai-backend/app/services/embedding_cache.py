@@ -0,0 +1,368 @@
+import os
+import json
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+import numpy as np
+from app.db.vector import chroma_manager
+from app.services.matcher import quantize_int8, int8_scores, int8_scores_batch
+
+# Where cached matrices are snapshotted between restarts
+CACHE_DIR = os.getenv("EMBED_CACHE_DIR", "./cache")
+
+# Upper bound on memory held by cached contracts
+EMBED_CACHE_SIZE_MB = int(os.getenv("EMBED_CACHE_SIZE_MB", "256"))
+
+# Hold cached matrices as int8 codes + per-row scales (4x smaller, approximate scores)
+EMBED_CACHE_INT8 = os.getenv("EMBED_CACHE_INT8", "0") == "1"
+
+# Above this many chunks in one contract the HNSW index beats a brute-force matrix scan;
+# int8 rows are a quarter of the bytes, so the scan stays cheaper for 4x as many
+BRUTE_FORCE_MAX_CHUNKS = 20_000 * (4 if EMBED_CACHE_INT8 else 1)
+
+class CachedContract:
+    """Chunks of one contract held in memory as a contiguous float32 (or int8 + scales) matrix"""
+
+    def __init__(self, matrix: np.ndarray, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]],
+                 scales: Optional[np.ndarray] = None):
+        self.matrix = matrix
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self.scales = scales
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        extra = self.scales.nbytes if self.scales is not None else 0
+        return self.matrix.nbytes + extra + sum(len(t) for t in self.texts if t)
+
+class BoundedEmbeddingCache:
+    """LRU of cached contracts that evicts least-recently-used entries past a byte budget"""
+
+    def __init__(self, max_bytes: int = 256 << 20):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.od: "OrderedDict[str, CachedContract]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedContract]:
+        with self._lock:
+            entry = self.od.get(key)
+            if entry is not None:
+                self.od.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: CachedContract, replace: bool = True) -> None:
+        with self._lock:
+            old = self.od.get(key)
+            if old is not None:
+                if not replace:
+                    return
+                self.bytes -= old.nbytes
+            self.od[key] = entry
+            self.od.move_to_end(key)
+            self.bytes += entry.nbytes
+            # Never evict the entry just inserted, even if it alone exceeds the budget
+            while self.bytes > self.max_bytes and len(self.od) > 1:
+                _, evicted = self.od.popitem(last=False)
+                self.bytes -= evicted.nbytes
+
+    def pop(self, key: str) -> None:
+        with self._lock:
+            entry = self.od.pop(key, None)
+            if entry is not None:
+                self.bytes -= entry.nbytes
+
+    def items(self) -> List[tuple]:
+        with self._lock:
+            return list(self.od.items())
+
+_cache = BoundedEmbeddingCache(max_bytes=EMBED_CACHE_SIZE_MB << 20)
+# Serializes read-modify-write updates such as append()
+_lock = threading.Lock()
+
+# Contracts known to exceed BRUTE_FORCE_MAX_CHUNKS, so their searches go straight to HNSW
+# without re-counting their rows; bounded LRU, cleared by append() and invalidate()
+OVERSIZED_MAX_ENTRIES = 1024
+_oversized: "OrderedDict[str, None]" = OrderedDict()
+_oversized_lock = threading.Lock()
+
+def _mark_oversized(contract_id: str) -> None:
+    with _oversized_lock:
+        _oversized[contract_id] = None
+        _oversized.move_to_end(contract_id)
+        while len(_oversized) > OVERSIZED_MAX_ENTRIES:
+            _oversized.popitem(last=False)
+
+def _is_oversized(contract_id: str) -> bool:
+    with _oversized_lock:
+        return contract_id in _oversized
+
+def _forget_oversized(contract_id: str) -> None:
+    with _oversized_lock:
+        _oversized.pop(contract_id, None)
+
+def _encode_rows(embeddings):
+    """Convert raw embeddings into the cache's storage format: (matrix, scales or None)"""
+    rows = np.ascontiguousarray(embeddings, dtype=np.float32)
+    if EMBED_CACHE_INT8:
+        return quantize_int8(rows)
+    return rows, None
+
+def warm(contract_id: str, collection_name: str = "contracts") -> Optional[CachedContract]:
+    """
+    Pull every chunk and embedding of a contract from ChromaDB into memory
+
+    Args:
+        contract_id: Contract identifier
+        collection_name: Chroma collection holding the chunks
+
+    Returns:
+        The cached entry, or None if the contract has no chunks
+    """
+    res = chroma_manager.get_documents(
+        where={"contract_id": contract_id},
+        include=["documents", "metadatas", "embeddings"],
+        collection_name=collection_name
+    )
+    ids = list(res.get("ids") or [])
+    if not ids:
+        # Don't cache misses; the contract may be uploaded by another worker later
+        return None
+    matrix, scales = _encode_rows(res["embeddings"])
+    entry = CachedContract(
+        matrix=matrix,
+        ids=ids,
+        texts=list(res.get("documents") or []),
+        metadatas=list(res.get("metadatas") or []),
+        scales=scales
+    )
+    _cache.put(contract_id, entry)
+    return entry
+
+def get(contract_id: str, collection_name: str = "contracts") -> Optional[CachedContract]:
+    """
+    Return the cached entry for a contract, warming it on first use
+
+    Returns None when the contract is too large for brute-force scoring,
+    in which case callers should fall back to the ChromaDB HNSW index.
+    """
+    entry = _cache.get(contract_id)
+    if entry is None:
+        if _is_oversized(contract_id):
+            return None
+        # Only this contract's rows are scanned, so its size (not the collection's) decides;
+        # counted once, then remembered
+        if chroma_manager.count(where={"contract_id": contract_id}, collection_name=collection_name) >= BRUTE_FORCE_MAX_CHUNKS:
+            _mark_oversized(contract_id)
+            return None
+        entry = warm(contract_id, collection_name)
+    return entry
+
+def append(contract_id: str, embeddings, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]) -> None:
+    """
+    Append freshly stored chunks to a contract already held in memory
+
+    Writes go to ChromaDB first; contracts that are not cached yet are
+    left alone and loaded lazily on their first search.
+    """
+    _forget_oversized(contract_id)
+    with _lock:
+        entry = _cache.get(contract_id)
+        if entry is None:
+            return
+        new_rows = np.asarray(embeddings, dtype=np.float32)
+        scales = None
+        if entry.scales is not None:
+            new_rows, new_scales = quantize_int8(new_rows)
+            scales = np.concatenate([entry.scales, new_scales])
+        _cache.put(contract_id, CachedContract(
+            matrix=np.ascontiguousarray(np.vstack([entry.matrix, new_rows])),
+            ids=entry.ids + list(ids),
+            texts=entry.texts + list(texts),
+            metadatas=entry.metadatas + list(metadatas),
+            scales=scales
+        ))
+
+def invalidate(contract_id: str) -> None:
+    """Drop a contract from the in-memory cache"""
+    _cache.pop(contract_id)
+    _forget_oversized(contract_id)
+
+def save_snapshot(cache_dir: str = CACHE_DIR) -> int:
+    """
+    Write every cached contract to disk as <contract_id>.npy + <contract_id>.json
+
+    Contracts are written least recently used first, so file mtimes follow LRU order.
+    Snapshots of contracts no longer cached are deleted.
+
+    Returns:
+        Number of contracts written
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    items = _cache.items()
+    for contract_id, entry in items:
+        base = os.path.join(cache_dir, contract_id)
+        # Write beside the target and rename: the old file may still be mmapped
+        with open(f"{base}.npy.tmp", "wb") as f:
+            np.save(f, entry.matrix)
+        with open(f"{base}.json.tmp", "w") as f:
+            json.dump({
+                "ids": entry.ids,
+                "texts": entry.texts,
+                "metadatas": entry.metadatas,
+                "scales": entry.scales.tolist() if entry.scales is not None else None
+            }, f)
+        os.replace(f"{base}.npy.tmp", f"{base}.npy")
+        os.replace(f"{base}.json.tmp", f"{base}.json")
+    cached = {contract_id for contract_id, _ in items}
+    for name in os.listdir(cache_dir):
+        if name.endswith(".npy") and name[:-len(".npy")] not in cached:
+            base = os.path.join(cache_dir, name[:-len(".npy")])
+            for path in (f"{base}.npy", f"{base}.json"):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+    return len(items)
+
+def load_snapshot(cache_dir: str = CACHE_DIR) -> int:
+    """
+    Memory-map snapshots written by save_snapshot() back into the cache
+
+    Matrices stay on disk-backed pages, so the OS can reclaim them under
+    memory pressure instead of holding them as private heap. Snapshots are read
+    most recently written first and loading stops at the cache's byte budget, so
+    contracts that would only be evicted again are never parsed.
+
+    Returns:
+        Number of contracts loaded
+    """
+    if not os.path.isdir(cache_dir):
+        return 0
+    snapshots = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith(".npy"):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            snapshots.append((os.path.getmtime(path), name[:-len(".npy")], path))
+        except OSError:
+            continue
+    snapshots.sort(reverse=True)
+
+    budget = _cache.max_bytes - _cache.bytes
+    selected = []
+    for _, contract_id, path in snapshots:
+        sidecar = os.path.join(cache_dir, f"{contract_id}.json")
+        if not os.path.exists(sidecar):
+            continue
+        try:
+            matrix = np.load(path, mmap_mode="r")
+            with open(sidecar) as f:
+                meta = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Skipping embedding snapshot {contract_id}: {e}")
+            continue
+        scales = np.asarray(meta["scales"], dtype=np.float32) if meta.get("scales") is not None else None
+        entry = CachedContract(matrix, meta["ids"], meta["texts"], meta["metadatas"], scales)
+        if entry.nbytes > budget:
+            break
+        budget -= entry.nbytes
+        selected.append((contract_id, entry))
+    # Oldest first, so the most recently written snapshot ends up most recently used
+    for contract_id, entry in reversed(selected):
+        _cache.put(contract_id, entry, replace=False)
+    return len(selected)
+
+def _select_top_k(scores: np.ndarray, top_k: int):
+    """Return (indices, scores) of the best top_k entries of a score vector, best first"""
+    k = min(top_k, scores.shape[0])
+    if k < scores.shape[0]:
+        idx = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idx = np.arange(scores.shape[0])
+    idx = idx[np.argsort(-scores[idx])]
+    return idx, scores[idx]
+
+def _scores(entry: CachedContract, q: np.ndarray) -> np.ndarray:
+    """Dot products of every cached chunk with a normalized query"""
+    if entry.scales is not None:
+        return int8_scores(entry.matrix, entry.scales, q)
+    # One BLAS sgemv over the whole contract; no graph traversal for small N
+    return entry.matrix.dot(q)
+
+def _top_k(entry: CachedContract, query_embedding, top_k: int):
+    """Score every chunk against the query and return (indices, scores) of the best top_k, best first"""
+    q = np.ascontiguousarray(query_embedding, dtype=np.float32)
+    norm = np.linalg.norm(q)
+    if norm > 0:
+        q = q / norm
+    return _select_top_k(_scores(entry, q), top_k)
+
+def search(entry: CachedContract, query_embedding, top_k: int = 5) -> Dict[str, Any]:
+    """
+    Cosine top-k over a cached contract using a single matrix-vector product
+
+    Args:
+        entry: Cached contract to search
+        query_embedding: Query vector
+        top_k: Number of results to return
+
+    Returns:
+        Results shaped like a ChromaDB query response
+    """
+    idx, scores = _top_k(entry, query_embedding, top_k)
+    return {
+        "ids": [[entry.ids[i] for i in idx]],
+        "documents": [[entry.texts[i] for i in idx]],
+        "metadatas": [[entry.metadatas[i] for i in idx]],
+        "distances": [(1.0 - scores).tolist()]
+    }
+
+def search_texts(entry: CachedContract, query_embedding, top_k: int = 5) -> List[str]:
+    """Like search(), but only gathers the chunk texts of the best matches"""
+    idx, _ = _top_k(entry, query_embedding, top_k)
+    return [entry.texts[i] for i in idx]
+
+def search_batch(entry: CachedContract, query_embeddings, top_k: int = 5) -> Dict[str, Any]:
+    """
+    Cosine top-k for several queries over a cached contract with one matrix-matrix product
+
+    Args:
+        entry: Cached contract to search
+        query_embeddings: (B, D) matrix of query vectors
+        top_k: Number of results to return per query
+
+    Returns:
+        Results shaped like a batched ChromaDB query response (one inner list per query)
+    """
+    Q = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+    norms = np.linalg.norm(Q, axis=1, keepdims=True)
+    Q = Q / np.where(norms > 0, norms, 1.0)
+    if entry.scales is not None:
+        all_scores = int8_scores_batch(entry.matrix, entry.scales, Q)
+    else:
+        all_scores = entry.matrix.dot(Q.T)
+    # Top-k of every query column at once: one argpartition + one argsort over (k, B)
+    n = all_scores.shape[0]
+    k = min(top_k, n)
+    if k < n:
+        top = np.argpartition(-all_scores, k - 1, axis=0)[:k]
+    else:
+        top = np.broadcast_to(np.arange(n)[:, None], all_scores.shape)
+    top_scores = np.take_along_axis(all_scores, top, axis=0)
+    order = np.argsort(-top_scores, axis=0)
+    top = np.take_along_axis(top, order, axis=0)
+    top_scores = np.take_along_axis(top_scores, order, axis=0)
+
+    out = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+    for idx, scores in zip(top.T.tolist(), (1.0 - top_scores.T).tolist()):
+        out["ids"].append([entry.ids[i] for i in idx])
+        out["documents"].append([entry.texts[i] for i in idx])
+        out["metadatas"].append([entry.metadatas[i] for i in idx])
+        out["distances"].append(scores)
+    return out
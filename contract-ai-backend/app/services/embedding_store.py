@@ -0,0 +1,77 @@
+import os
+import hashlib
+import sqlite3
+import threading
+from typing import List, Dict
+import numpy as np
+
+# SQLite file holding embeddings keyed by chunk content hash
+EMBED_STORE_PATH = os.getenv("EMBED_STORE_PATH", "./cache/embeddings.sqlite3")
+
+# Vectors are stored as float16: half the bytes, well below retrieval-relevant precision
+STORE_DTYPE = np.float16
+
+# SQLite caps host parameters per statement; stay well under it
+_SELECT_BATCH = 500
+
+_conn = None
+_lock = threading.Lock()
+
+def _connect() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(EMBED_STORE_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(EMBED_STORE_PATH, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "hash TEXT PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL, vec BLOB NOT NULL)"
+        )
+        _conn = conn
+    return _conn
+
+def content_hash(text: str, model_name: str) -> str:
+    """SHA-256 of whitespace-normalized text, scoped to the embedding model"""
+    normalized = " ".join(text.split())
+    return hashlib.sha256(f"{model_name}\x00{normalized}".encode("utf-8")).hexdigest()
+
+def get_many(hashes: List[str]) -> Dict[str, np.ndarray]:
+    """
+    Look up cached vectors by content hash
+
+    Args:
+        hashes: Content hashes from content_hash()
+
+    Returns:
+        Mapping of hash -> float32 vector for every hash found
+    """
+    found = {}
+    unique = list(dict.fromkeys(hashes))
+    with _lock:
+        conn = _connect()
+        for start in range(0, len(unique), _SELECT_BATCH):
+            batch = unique[start:start + _SELECT_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT hash, dim, vec FROM embeddings WHERE hash IN ({placeholders})", batch
+            ).fetchall()
+            for h, dim, blob in rows:
+                # Rows written before the switch to float16 hold 4 bytes per component
+                dtype = np.float32 if len(blob) == 4 * dim else STORE_DTYPE
+                found[h] = np.frombuffer(blob, dtype=dtype).astype(np.float32)
+    return found
+
+def put_many(hashes: List[str], vectors, model_name: str) -> None:
+    """Insert or replace cached vectors for the given content hashes"""
+    if not len(hashes):
+        return
+    vectors = np.asarray(vectors, dtype=STORE_DTYPE)
+    dim = int(vectors.shape[1])
+    rows = [(h, model_name, dim, vec.tobytes()) for h, vec in zip(hashes, vectors)]
+    with _lock:
+        conn = _connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (hash, model, dim, vec) VALUES (?, ?, ?, ?)", rows
+            )
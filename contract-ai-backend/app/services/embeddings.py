@@ -1,13 +1,68 @@
-from sentence_transformers import SentenceTransformer
+import os
 import numpy as np
+from collections import namedtuple
 from app.db.vector import chroma_manager
+from app.services import embedding_cache, embedding_store
 from typing import List, Dict, Any
-import uuid
+from functools import lru_cache
+from app.utils.ids import new_id, new_seq
 
-# Initialize the model
-model = SentenceTransformer("all-MiniLM-L6-v2")
+MODEL_NAME = "all-MiniLM-L6-v2"
 
-def embed_chunks(chunks: List[str]) -> List[List[float]]:
+# "sentence-transformers" (PyTorch) or "fastembed" (ONNX, same model and vector space)
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "sentence-transformers").lower()
+
+EMBED_BATCH_SIZE = 64
+# Run the encoder in half precision when it is on a GPU (tensor cores); CPU always stays float32
+EMBED_FP16 = os.getenv("EMBED_FP16", "1") == "1"
+# FastEmbed splits batches at least this large across one worker process per core
+FASTEMBED_PARALLEL_MIN = 256
+# Wrap the transformer in torch.compile (graph fusion); off by default, compilation takes a while
+EMBED_COMPILE = os.getenv("EMBED_COMPILE", "0") == "1"
+
+# Initialize the model once per process
+if EMBED_BACKEND == "fastembed":
+    from fastembed import TextEmbedding
+    # lazy_load defers loading the ONNX weights to the first encode in each worker
+    model = TextEmbedding(model_name=f"sentence-transformers/{MODEL_NAME}", lazy_load=True)
+else:
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(MODEL_NAME)
+    if EMBED_FP16 and model.device.type == "cuda":
+        model.half()
+    if EMBED_COMPILE:
+        import torch
+        # Batch size and padded sequence length vary per call, so compile for dynamic shapes
+        model[0].auto_model = torch.compile(model[0].auto_model, dynamic=True)
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    """
+    Generate embeddings for a batch of texts in one encoder pass
+    
+    Args:
+        texts: List of input texts
+    
+    Returns:
+        Array of normalized embedding vectors, shape (len(texts), dim)
+    """
+    if EMBED_BACKEND == "fastembed":
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        parallel = 0 if len(texts) >= FASTEMBED_PARALLEL_MIN else None
+        vecs = np.vstack(list(model.embed(texts, batch_size=EMBED_BATCH_SIZE, parallel=parallel))).astype(np.float32)
+        norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+        return vecs / np.where(norms > 0, norms, 1.0)
+    # One encode call over the whole list; sentence-transformers pads per micro-batch
+    # of EMBED_BATCH_SIZE and runs without autograd
+    vecs = model.encode(
+        texts,
+        batch_size=EMBED_BATCH_SIZE,
+        normalize_embeddings=True,
+        convert_to_numpy=True
+    )
+    return vecs.astype(np.float32, copy=False)
+
+def embed_chunks(chunks: List[str]) -> np.ndarray:
     """
     Generate embeddings for text chunks
     
@@ -15,27 +70,83 @@ def embed_chunks(chunks: List[str]) -> List[List[float]]:
         chunks: List of text chunks
     
     Returns:
-        List of embedding vectors
+        float32 array of embedding vectors, shape (len(chunks), dim); kept as an
+        array end to end, never converted to Python lists
     """
     print("chunking the list of texts")
-    return model.encode(chunks, normalize_embeddings=True)
+    return embed_texts(chunks)
+
+def embed_chunks_cached(chunks: List[str]) -> np.ndarray:
+    """
+    Generate embeddings for text chunks, reusing vectors of previously seen text
+    
+    Chunks are keyed by a content hash in the on-disk embedding store; only
+    misses go through the encoder, and repeated text (boilerplate, signature
+    blocks) is encoded once. Store failures fall back to encoding every
+    distinct chunk.
+    
+    Args:
+        chunks: List of text chunks
+    
+    Returns:
+        Array of embedding vectors in the order of chunks
+    """
+    if not chunks:
+        return embed_chunks(chunks)
+    hashes = [embedding_store.content_hash(t, MODEL_NAME) for t in chunks]
+    store_ok = True
+    try:
+        cached = embedding_store.get_many(hashes)
+    except Exception as e:
+        print(f"⚠️ Embedding store unavailable, embedding all chunks: {e}")
+        cached, store_ok = {}, False
+    
+    # First text for every distinct hash the store doesn't have
+    misses: Dict[str, str] = {}
+    for h, t in zip(hashes, chunks):
+        if h not in cached:
+            misses.setdefault(h, t)
+    if misses:
+        fresh = embed_chunks(list(misses.values()))
+        if store_ok:
+            try:
+                embedding_store.put_many(list(misses), fresh, MODEL_NAME)
+            except Exception as e:
+                print(f"⚠️ Could not write to embedding store: {e}")
+        cached.update(zip(misses, fresh))
+    return np.vstack([cached[h] for h in hashes]).astype(np.float32, copy=False)
 
+@lru_cache(maxsize=4096)
 def embed_text(text: str) -> List[float]:
     """
     Generate embedding for single text
     
+    Results are cached so repeated questions skip the encoder. The returned
+    vector is shared between callers and marked read-only.
+    
     Args:
         text: Input text
     
     Returns:
         Embedding vector
     """
-    return model.encode([text], normalize_embeddings=True)[0]
+    vec = embed_texts([text])[0]
+    vec.setflags(write=False)
+    return vec
+
+def make_ids(contract_id: str, n: int) -> List[str]:
+    """
+    Build chunk IDs for a contract as "<contract_id>:<chunk_index>"
+    
+    Deterministic and shorter than a UUID per chunk, and avoids one
+    os.urandom call per chunk on large ingests.
+    """
+    return [f"{contract_id}:{i}" for i in range(n)]
 
 def store_embeddings(
     contract_id: str,
     chunks: List[str],
-    embeddings: List[List[float]],
+    embeddings: np.ndarray,
     titles: None = None,  # legacy param not used when metadatas provided
     metadatas: None = None
 ) -> List[str]:
@@ -45,7 +156,7 @@ def store_embeddings(
     Args:
         contract_id: Unique contract identifier
         chunks: List of text chunks
-        embeddings: List of embedding vectors
+        embeddings: Embedding matrix, shape (len(chunks), dim); lists of vectors are accepted too
         titles: Optional list of titles (legacy)
         metadatas: Optional list of metadata dicts
     
@@ -59,18 +170,20 @@ def store_embeddings(
             if titles and i < len(titles):
                 md["title"] = titles[i]
             metadatas.append(md)
-    ids = [str(uuid.uuid4()) for _ in chunks]
+    ids = make_ids(contract_id, len(chunks))
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
     
-    chroma_manager.add_documents(
+    chroma_manager.add_documents_batched(
         documents=chunks,
         embeddings=embeddings,
         metadatas=metadatas,
         ids=ids,
         collection_name="contracts"
     )
+    embedding_cache.append(contract_id, embeddings, ids, chunks, metadatas)
     return ids
 
-def semantic_search(query: str, top_k: int = 5, contract_id: str = None) -> Dict[str, Any]:
+def semantic_search(query: str, top_k: int = 5, contract_id: str = None, include: List[str] = None) -> Dict[str, Any]:
     """
     Perform semantic search across contracts
     
@@ -78,12 +191,19 @@ def semantic_search(query: str, top_k: int = 5, contract_id: str = None) -> Dict
         query: Search query
         top_k: Number of results to return
         contract_id: Optional filter by contract ID
+        include: Optional Chroma fields to return (documents, metadatas, distances)
     
     Returns:
         Search results from ChromaDB
     """
     query_embedding = embed_text(query)
     
+    if contract_id:
+        # Per-contract searches are served from the in-memory chunk matrix
+        cached = embedding_cache.get(contract_id)
+        if cached is not None:
+            return embedding_cache.search(cached, query_embedding, top_k=top_k)
+    
     where_filter = None
     if contract_id:
         where_filter = {"contract_id": contract_id}
@@ -92,9 +212,83 @@ def semantic_search(query: str, top_k: int = 5, contract_id: str = None) -> Dict
         query_embedding=query_embedding,
         top_k=top_k,
         where=where_filter,
-        collection_name="contracts"
+        collection_name="contracts",
+        include=include
+    )
+
+def semantic_search_batch(queries: List[str], top_k: int = 5, contract_id: str = None, include: List[str] = None) -> Dict[str, Any]:
+    """
+    Perform several semantic searches with one batched encode and one vector query
+    
+    Args:
+        queries: Search queries
+        top_k: Number of results to return per query
+        contract_id: Optional filter by contract ID
+        include: Optional Chroma fields to return (documents, metadatas, distances)
+    
+    Returns:
+        Batched search results; index i of each field belongs to queries[i]
+    """
+    query_embeddings = embed_texts(queries)
+    
+    if contract_id:
+        cached = embedding_cache.get(contract_id)
+        if cached is not None:
+            return embedding_cache.search_batch(cached, query_embeddings, top_k=top_k)
+    
+    return chroma_manager.search_similar_batch(
+        query_embeddings=query_embeddings,
+        top_k=top_k,
+        where={"contract_id": contract_id} if contract_id else None,
+        collection_name="contracts",
+        include=include
     )
 
+# One query's hits from a batched search, as positional fields instead of nested dict lookups
+SearchResult = namedtuple("SearchResult", "chunks metadatas distances")
+
+def split_batch_results(results: Dict[str, Any], n: int) -> List[SearchResult]:
+    """
+    Split a batched search response into one SearchResult per query
+    
+    Args:
+        results: Response of semantic_search_batch (or a batched Chroma query)
+        n: Number of queries in the batch; missing rows come back empty
+    
+    Returns:
+        n SearchResult views, in query order
+    """
+    docs = results.get("documents") or []
+    metas = results.get("metadatas") or []
+    dists = results.get("distances") or []
+    return [
+        SearchResult(
+            docs[i] if i < len(docs) and docs[i] else [],
+            metas[i] if i < len(metas) and metas[i] else [],
+            dists[i] if i < len(dists) and dists[i] else []
+        )
+        for i in range(n)
+    ]
+
+def semantic_search_texts(query: str, contract_id: str, top_k: int = 5) -> List[str]:
+    """
+    Return only the texts of the chunks of a contract most similar to the query
+    
+    Args:
+        query: Search query
+        contract_id: Contract to search within
+        top_k: Number of results to return
+    
+    Returns:
+        Matching chunk texts, best first
+    """
+    cached = embedding_cache.get(contract_id)
+    if cached is not None:
+        return embedding_cache.search_texts(cached, embed_text(query), top_k=top_k)
+    results = semantic_search(query, top_k=top_k, contract_id=contract_id, include=["documents"])
+    docs = results.get("documents") if results else None
+    return list(docs[0]) if docs else []
+
 def get_contract_chunks(contract_id: str) -> Dict[str, Any]:
     """
     Get all chunks for a specific contract
@@ -103,14 +297,24 @@ def get_contract_chunks(contract_id: str) -> Dict[str, Any]:
         contract_id: Contract identifier
     
     Returns:
-        All chunks for the contract
+        All chunks for the contract, in chunk order, shaped like a single-query
+        ChromaDB response ({"ids": [[...]], "documents": [[...]], "metadatas": [[...]]})
     """
-    return chroma_manager.search_similar(
-        query_embedding=[0.0] * 384,  # Dummy embedding
+    # Metadata filter only: no vector search and no cap on the number of chunks
+    res = chroma_manager.get_documents(
         where={"contract_id": contract_id},
-        top_k=1000,
+        include=["documents", "metadatas"],
         collection_name="contracts"
     )
+    ids = res.get("ids") or []
+    docs = res.get("documents") or []
+    metas = res.get("metadatas") or []
+    order = sorted(range(len(ids)), key=lambda i: ((metas[i] or {}).get("chunk_index") or 0))
+    return {
+        "ids": [[ids[i] for i in order]],
+        "documents": [[docs[i] for i in order]],
+        "metadatas": [[metas[i] for i in order]]
+    }
 
 def delete_contract_embeddings(contract_id: str) -> None:
     """
@@ -134,7 +338,6 @@ def upload_standard_clauses(json_path: str = "./app/standards/msa_playbook.json"
         Number of clauses uploaded
     """
     import json
-    import os
 
     if not os.path.exists(json_path):
         raise FileNotFoundError(f"JSON file not found: {json_path}")
@@ -152,7 +355,7 @@ def upload_standard_clauses(json_path: str = "./app/standards/msa_playbook.json"
     ids = []
 
     for clause in clauses:
-        clause_id = clause.get("id", str(uuid.uuid4()))
+        clause_id = clause.get("id") or new_id()
         title = clause.get("title", "")
         preferred = clause.get("preferred", "")
         fallbacks = clause.get("fallbacks", [])
@@ -172,18 +375,20 @@ def upload_standard_clauses(json_path: str = "./app/standards/msa_playbook.json"
             "keywords": ", ".join(keywords) if keywords else "",
             "weight": weight,
             "preferred": preferred,
-            "fallbacks": ", ".join(fallbacks) if fallbacks else ""
+            "fallbacks": ", ".join(fallbacks) if fallbacks else "",
+            # Cursor key for list_clauses pagination
+            "seq": new_seq()
         }
 
         documents.append(text)
         metadatas.append(metadata)
         ids.append(clause_id)
 
-    # Generate embeddings
-    embeddings = embed_chunks(documents)
+    # Generate embeddings; clauses unchanged since the last upload come from the embedding store
+    embeddings = embed_chunks_cached(documents)
 
     # Store in ChromaDB
-    chroma_manager.add_documents(
+    chroma_manager.add_documents_batched(
         documents=documents,
         embeddings=embeddings,
         metadatas=metadatas,
@@ -0,0 +1,124 @@
+import os
+from typing import List, Tuple
+from app.services.ocr import extract_text_from_image, extract_text_smart, ocr_pdf_pages, MIN_TEXT_LAYER_CHARS
+from app.services.chunk import chunk_text
+try:
+    from app.services.sectioner import section_text_best
+    from app.services.pdf_pages import extract_pages_text_parallel, extract_pdf_text
+    HAVE_PAGES = HAVE_PAGE_EXTRACT = True
+except Exception:
+    HAVE_PAGES = HAVE_PAGE_EXTRACT = False
+
+# Kept free of model/DB imports: this module is loaded by ingest worker processes
+
+IMAGE_EXTS = frozenset({"png", "jpg", "jpeg", "tiff", "bmp"})
+
+def file_extension(filename: str) -> str:
+    """Lower-case extension of a file name without the dot ("" if it has none)"""
+    return os.path.splitext(filename)[1][1:].lower()
+
+class ExtractionError(Exception):
+    """Extraction failure carrying the HTTP status to report; picklable across processes"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+def extract_document_text(file_info: dict) -> dict:
+    """
+    Extract the full text of one saved upload (used by batch uploads)
+    
+    Args:
+        file_info: {"contract_id", "path", "filename"}
+    
+    Returns:
+        {"contract_id", "filename", "characters", "message"}
+    """
+    path = file_info["path"]
+    filename = file_info["filename"]
+    ext = file_extension(filename)
+
+    if ext == "pdf":
+        text = extract_pdf_text(path) if HAVE_PAGE_EXTRACT else ""
+        if not text.strip():  # scanned PDF fallback to OCR
+            text = "\n".join(ocr_pdf_pages(path, lang="eng", dpi=300)).strip()
+    elif ext in IMAGE_EXTS:
+        text = extract_text_from_image(path, lang="eng")
+    else:
+        raise ExtractionError(400, f"Unsupported file type: {ext}")
+
+    if not text.strip():
+        raise ExtractionError(400, "Could not extract text from document")
+
+    return {
+        "contract_id": file_info["contract_id"],
+        "filename": filename,
+        "characters": len(text),
+        "message": "Extraction completed"
+    }
+
+def extract_sections(dest_path: str, file_ext: str) -> Tuple[List[str], List[str], List[int], List[int]]:
+    """
+    Extract text from a saved upload and split it into sections
+    
+    Args:
+        dest_path: Path of the saved file
+        file_ext: Lower-case file extension without the dot
+    
+    Returns:
+        (sections, titles, page_starts, page_ends); page lists are empty when unknown
+    """
+    raw_text = ""
+    sections = []
+    titles = []
+    page_starts = []
+    page_ends = []
+
+    if file_ext == "pdf":
+        pages = extract_pages_text_parallel(dest_path) if HAVE_PAGES and HAVE_PAGE_EXTRACT else []  # [(pno, text)]
+        if sum(len(ptxt.strip()) for _, ptxt in pages) >= MIN_TEXT_LAYER_CHARS:
+            # Page-aware pipeline on the embedded text layer; reuse the page text instead of re-parsing
+            sec_objs = section_text_best(dest_path, raw_text="".join(ptxt for _, ptxt in pages))
+            if not sec_objs:
+                raise ExtractionError(400, "Could not segment PDF into sections")
+            sections = [s["text"] for s in sec_objs]
+            titles = [s["title"] for s in sec_objs]
+            page_starts = [s["page_start"] for s in sec_objs]
+            page_ends = [s["page_end"] for s in sec_objs]
+        else:
+            # Simple extraction + sectioning; scans without a text layer go through OCR
+            raw_text = extract_text_smart(dest_path)
+            if not raw_text.strip():
+                raise ExtractionError(400, "Could not extract text from PDF")
+            sec_objs = chunk_text(raw_text)
+            if not sec_objs:
+                raise ExtractionError(400, "Could not segment PDF into sections")
+            # section_text returns list[dict] with {"title","text"} if using the new function
+            # or list[str] if using legacy; normalize both
+            if isinstance(sec_objs, list) and sec_objs and isinstance(sec_objs[0], dict):
+                sections = [s["text"] for s in sec_objs]
+                titles = [s["title"] for s in sec_objs]
+            else:
+                sections = list(sec_objs)
+                titles = ["" for _ in sections]
+    elif file_ext in IMAGE_EXTS:
+        raw_text = extract_text_from_image(dest_path)
+        if not raw_text.strip():
+            raise ExtractionError(400, "Could not extract text from image")
+        sec_objs = chunk_text(raw_text)
+        if not sec_objs:
+            raise ExtractionError(400, "Could not segment image text into sections")
+        if isinstance(sec_objs, list) and sec_objs and isinstance(sec_objs[0], dict):
+            sections = [s["text"] for s in sec_objs]
+            titles = [s["title"] for s in sec_objs]
+        else:
+            sections = list(sec_objs)
+            titles = ["" for _ in sections]
+    else:
+        raise ExtractionError(400, "Unsupported file type")
+
+    if not sections:
+        raise ExtractionError(400, "No content sections produced from document")
+    return sections, titles, page_starts, page_ends
+
@@ -0,0 +1,196 @@
+import asyncio
+import io
+import os
+import shutil
+from app.utils.ids import new_id
+import threading
+import multiprocessing
+import concurrent.futures
+from fastapi import HTTPException, UploadFile
+from app.services.embeddings import embed_chunks_cached, store_embeddings
+from app.services.extraction import extract_sections, file_extension, ExtractionError
+from app.services.llm import categorize_chunks
+
+# Local upload dir (optional backup)
+UPLOAD_DIR = os.path.join(os.getcwd(), "uploads")
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+# Worker processes for text extraction; 0 runs it in the calling thread
+INGEST_PROCESSES = int(os.getenv("INGEST_PROCESSES", str(os.cpu_count() or 1)))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Categorization is network-bound (Gemini), so it runs on a thread while this thread embeds;
+# bounded so concurrent uploads don't pile up LLM calls
+INGEST_CATEGORIZE_THREADS = int(os.getenv("INGEST_CATEGORIZE_THREADS", "4"))
+_categorize_pool = concurrent.futures.ThreadPoolExecutor(
+    max_workers=INGEST_CATEGORIZE_THREADS, thread_name_prefix="ingest-categorize"
+)
+
+def _get_pool() -> concurrent.futures.ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn, not fork: the parent holds the embedding model and client threads
+                _pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=INGEST_PROCESSES,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _pool
+
+def _run_cpu(fn, *args):
+    """Run a CPU-bound, picklable function in the ingest process pool and wait for it"""
+    if INGEST_PROCESSES <= 0:
+        return fn(*args)
+    return _get_pool().submit(fn, *args).result()
+
+async def run_cpu_async(fn, *args):
+    """Like _run_cpu(), but awaitable so several jobs can share the pool concurrently"""
+    if INGEST_PROCESSES <= 0:
+        return await asyncio.to_thread(fn, *args)
+    return await asyncio.wrap_future(_get_pool().submit(fn, *args))
+
+def shutdown_pool() -> None:
+    """Stop ingest worker processes"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+def _copy_upload(src, dst: str) -> None:
+    """Copy a spooled upload to dst; kernel-side sendfile when it already lives on disk"""
+    src.seek(0)
+    with open(dst, "wb") as out:
+        # SpooledTemporaryFile.fileno() would force an in-memory upload to disk first, so only
+        # use it once the spool has rolled over (_rolled is absent on plain file objects)
+        if getattr(src, "_rolled", True):
+            try:
+                fd = src.fileno()
+            except (AttributeError, OSError, io.UnsupportedOperation):
+                fd = None
+            if fd is not None:
+                size = os.fstat(fd).st_size
+                offset = 0
+                try:
+                    while offset < size:
+                        sent = os.sendfile(out.fileno(), fd, offset, size - offset)
+                        if sent == 0:
+                            break
+                        offset += sent
+                    return
+                except OSError:
+                    # sendfile unsupported for this pair of files: copy the rest in userspace
+                    src.seek(offset)
+        shutil.copyfileobj(src, out, length=4 << 20)
+
+async def save_upload(f: UploadFile, dst: str) -> None:
+    """Write an upload to disk without blocking the event loop"""
+    await asyncio.to_thread(_copy_upload, f.file, dst)
+
+_TITLE_MAX = 160
+_TITLE_TRAIL = " ,;:.-"
+
+def _clip_title(text: str) -> str:
+    """First 160 chars without trailing punctuation, plus an ellipsis"""
+    return text[:_TITLE_MAX].rstrip(_TITLE_TRAIL) + "…"
+
+def process_saved_upload(contract_id: str, filename: str, dest_path: str, file_ext: str) -> dict:
+    """Extract, section, categorize, embed and store a saved upload (blocking; run off the event loop)"""
+    print("📄 Extracting text from PDF...")
+    # 1) Extract text (and pages if available); OCR and pdfminer are CPU-bound, so use the process pool
+    try:
+        sections, titles, page_starts, page_ends = _run_cpu(extract_sections, dest_path, file_ext)
+    except ExtractionError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    # Sanity check and fix swapped title/body
+    fixed_bodies = []
+    fixed_titles = []
+    for t, b in zip(titles, sections):
+        tt = t.strip() if t else ""
+        bb = b.strip() if b else ""
+        if not bb and len(tt) > 200:
+            # Treat this as a mis-detected header; move text into body and shorten title
+            bb = tt
+            tt = _clip_title(tt)
+        elif not tt:
+            # Fallback: first 160 chars of body as title (whitespace collapsed only here)
+            tmp = " ".join(bb.split())
+            tt = _clip_title(tmp) if tmp else "Untitled"
+        elif len(tt) > _TITLE_MAX:
+            # Truncate title to 160 chars
+            tt = _clip_title(tt)
+        fixed_bodies.append(bb)
+        fixed_titles.append(tt)
+
+    # Ensure no empty document bodies
+    assert all(isinstance(d, str) and d.strip() != "" for d in fixed_bodies), "Empty document body detected"
+
+    # 1.5) Categorize chunks using Gemini API (in the background, overlapping the embedding)
+    print("🤖 Categorizing chunks...")
+    categorize = _categorize_pool.submit(categorize_chunks, fixed_bodies)
+
+    # 2) Embeddings
+    print("⚡ Generating embeddings...")
+    try:
+        embeddings = embed_chunks_cached(fixed_bodies)
+    except Exception as ee:
+        categorize.cancel()
+        raise HTTPException(status_code=500, detail=f"Embedding failed: {ee}")
+
+    try:
+        categories = categorize.result()
+        for i, category in enumerate(categories):
+            print(f"   Chunk {i+1}/{len(fixed_bodies)}: {category}")
+    except Exception as ce:
+        print(f"   Categorization failed - {str(ce)}")
+        categories = ["Uncategorized"] * len(fixed_bodies)
+
+    # 3) Store with metadata (including pages and categories if available)
+    metadatas = []
+    for i in range(len(fixed_bodies)):
+        md = {"contract_id": contract_id, "chunk_index": i, "title": fixed_titles[i], "category": categories[i]}
+        if page_starts and page_ends and i < len(page_starts):
+            md["page_start"] = page_starts[i]
+            md["page_end"] = page_ends[i]
+        metadatas.append(md)
+
+    try:
+        store_embeddings(contract_id, fixed_bodies, embeddings, metadatas=metadatas)
+    except TypeError:
+        # Backward compatibility with older store_embeddings(signature with titles)
+        store_embeddings(contract_id, fixed_bodies, embeddings, titles=fixed_titles)
+
+    return {
+        "contract_id": contract_id,
+        "filename": filename,
+        "chunks_processed": len(sections),
+    }
+
+
+async def ingest_document(file: UploadFile, upload_dir: str = UPLOAD_DIR) -> dict:
+    """
+    Save an uploaded contract and run the full ingest pipeline on it
+    
+    Args:
+        file: Uploaded PDF or image
+        upload_dir: Directory the original file is kept in
+    
+    Returns:
+        Dict with contract_id, filename and chunks_processed
+    """
+    print("📂 Starting contract upload...")
+    contract_id = new_id()
+    filename = file.filename or "document"
+    file_ext = file_extension(filename)
+    if not file_ext:
+        raise HTTPException(status_code=400, detail="File must have an extension")
+
+    dest_path = os.path.join(upload_dir, f"{contract_id}.{file_ext}")
+    print(f"➡️ Saving file: {file.filename}")
+    await save_upload(file, dest_path)
+    # OCR, sectioning, LLM categorization and embedding all block; keep them off the event loop
+    return await asyncio.to_thread(process_saved_upload, contract_id, filename, dest_path, file_ext)
@@ -3,6 +3,7 @@ import os
 import requests
 import json
 import re
+import concurrent.futures
 from app.config import GEMINI_API_KEY
 
 import os
@@ -134,6 +135,46 @@ Please respond with only a single, concise category name (e.g., "Payment Terms",
     except Exception as e:
         return f"Uncategorized (Error: {str(e)})"
 
+# Chunks categorized per Gemini request, and requests in flight at once
+CATEGORIZE_BATCH_SIZE = 25
+CATEGORIZE_CONCURRENCY = 8
+
+def _categorize_batch(chunks: List[str]) -> List[str]:
+    """Categorize several chunks with one Gemini request; falls back to one request per chunk"""
+    numbered = "\n\n".join(f"### Chunk {i + 1}\n{c}" for i, c in enumerate(chunks))
+    prompt = f"""Analyze each of the following {len(chunks)} contract text chunks and categorize it with a concise category name based on its main topic or clause type (e.g., "Payment Terms", "Confidentiality", "Termination", "Liability", "Intellectual Property", etc.).
+
+{numbered}
+
+Return JSON of the form {{"categories": [string, ...]}} with exactly {len(chunks)} entries, one per chunk, in chunk order."""
+    try:
+        result = gemini_json(prompt)
+        categories = result.get("categories") if isinstance(result, dict) else None
+        if isinstance(categories, list) and len(categories) == len(chunks):
+            out = [str(c).strip().strip('"').strip("'").strip() for c in categories]
+            return [c if c else "Uncategorized" for c in out]
+    except Exception as e:
+        print(f"⚠️ Batched categorization failed, falling back to per-chunk calls: {e}")
+    return [categorize_chunk(c) for c in chunks]
+
+def categorize_chunks(chunks: List[str]) -> List[str]:
+    """Categorize many contract chunks with a few batched Gemini requests; one category per chunk, in order"""
+    if not chunks:
+        return []
+    if not GEMINI_API_KEY:
+        raise ValueError("GEMINI_API_KEY environment variable is not set")
+    # Boilerplate repeats verbatim across a contract; send each distinct text once
+    unique = list(dict.fromkeys(chunks))
+    batches = [unique[i:i + CATEGORIZE_BATCH_SIZE] for i in range(0, len(unique), CATEGORIZE_BATCH_SIZE)]
+    if len(batches) == 1:
+        categories = _categorize_batch(batches[0])
+    else:
+        # Requests are network-bound; overlap them instead of paying one round trip after another
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(CATEGORIZE_CONCURRENCY, len(batches))) as ex:
+            categories = [c for batch in ex.map(_categorize_batch, batches) for c in batch]
+    by_text = dict(zip(unique, categories))
+    return [by_text[c] for c in chunks]
+
 
 class LLMService:
     """Service for handling LLM interactions"""
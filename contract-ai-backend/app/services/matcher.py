@@ -1,10 +1,86 @@
 from typing import List, Dict, Tuple
 import numpy as np
 
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except Exception:
+    njit = prange = None
+    HAVE_NUMBA = False
+
 def calculate_similarity(vec1: np.ndarray, vec2: np.ndarray) -> float:
     """Calculate cosine similarity between two vectors"""
     return np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
 
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetric per-vector int8 quantization (scale = max(|v|) / 127)
+    
+    Args:
+        vectors: A single vector or a (N, D) matrix of vectors
+    
+    Returns:
+        Tuple of (int8 codes, per-vector float32 scales)
+    """
+    arr = np.asarray(vectors, dtype=np.float32)
+    peak = np.max(np.abs(arr), axis=-1, keepdims=True)
+    scale = np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+    codes = np.rint(arr / scale).astype(np.int8)
+    return codes, np.squeeze(scale, axis=-1)
+
+def dequantize_int8(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """Reconstruct float32 vectors from int8 codes and their per-vector scales"""
+    return codes.astype(np.float32) * np.expand_dims(np.asarray(scales, dtype=np.float32), -1)
+
+if HAVE_NUMBA:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _int8_dot_rows(codes, q_codes):
+        # int8 x int8 products widened into int32 accumulators (VNNI-friendly)
+        n, d = codes.shape
+        out = np.empty(n, dtype=np.int32)
+        for i in prange(n):
+            acc = np.int32(0)
+            for j in range(d):
+                acc += np.int32(codes[i, j]) * np.int32(q_codes[j])
+            out[i] = acc
+        return out
+
+def int8_scores(codes: np.ndarray, scales: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """
+    Approximate dot products between int8-quantized rows and a float query
+    
+    Args:
+        codes: (N, D) int8 matrix from quantize_int8
+        scales: (N,) per-row scales from quantize_int8
+        query: Float query vector
+    
+    Returns:
+        (N,) float32 scores
+    """
+    q_codes, q_scale = quantize_int8(query)
+    if HAVE_NUMBA:
+        raw = _int8_dot_rows(np.ascontiguousarray(codes), q_codes)
+    else:
+        raw = codes.astype(np.int32) @ q_codes.astype(np.int32)
+    return raw.astype(np.float32) * scales * np.float32(q_scale)
+
+def int8_scores_batch(codes: np.ndarray, scales: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    """
+    Like int8_scores(), for several queries in one pass over the codes
+    
+    Args:
+        codes: (N, D) int8 matrix from quantize_int8
+        scales: (N,) per-row scales from quantize_int8
+        queries: (B, D) float query matrix
+    
+    Returns:
+        (N, B) float32 scores
+    """
+    q_codes, q_scales = quantize_int8(queries)
+    # int32 accumulation: 127 * 127 * D stays far below 2**31 for any embedding size in use
+    raw = codes.astype(np.int32) @ q_codes.astype(np.int32).T
+    return raw.astype(np.float32) * scales[:, None] * q_scales[None, :]
+
 def find_best_matches(
     query_vector: np.ndarray,
     candidate_vectors: List[np.ndarray],
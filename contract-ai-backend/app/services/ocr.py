@@ -1,8 +1,11 @@
 import os
 import re
+import tempfile
+import concurrent.futures
+from typing import List
 from PIL import Image
 import pytesseract
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 
 # Configure tesseract path - try to find it automatically or use environment variable
 def get_tesseract_path():
@@ -37,6 +40,60 @@ def get_tesseract_path():
 # Set tesseract path
 pytesseract.pytesseract.tesseract_cmd = get_tesseract_path()
 
+# Pages rasterized / OCR'd at once; each tesseract call is its own subprocess
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+# Pages rasterized to temp files per round; bounds temp disk use on long scans
+OCR_PAGE_WINDOW = int(os.getenv("OCR_PAGE_WINDOW", str(2 * OCR_WORKERS)))
+
+def _ocr_page_file(path: str, lang: str) -> str:
+    """OCR one rasterized page and delete its image right away"""
+    try:
+        return pytesseract.image_to_string(path, lang=lang) or ""
+    finally:
+        os.remove(path)
+
+def ocr_pdf_pages(file_path: str, lang: str = "eng", dpi: int = 300) -> List[str]:
+    """
+    OCR every page of a PDF, running one tesseract process per page in parallel
+    
+    Pages are rasterized to disk a window at a time and each image is removed
+    as soon as it is OCR'd, so neither memory nor temp space grows with page count.
+    The next window is rasterized while the current one is being OCR'd.
+    
+    Args:
+        file_path: Path to the PDF file
+        lang: Language code for OCR (default: eng)
+        dpi: Rasterization resolution
+    
+    Returns:
+        Text of each page, in page order
+    """
+    n_pages = int(pdfinfo_from_path(file_path).get("Pages") or 0)
+    window = max(1, OCR_PAGE_WINDOW)
+    windows = [(first, min(first + window - 1, n_pages)) for first in range(1, n_pages + 1, window)]
+    texts: List[str] = []
+    with tempfile.TemporaryDirectory() as tmp, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=max(1, OCR_WORKERS)) as ex, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=1) as raster:
+
+        def rasterize(pages: tuple) -> List[str]:
+            # Rasterize to files instead of holding every page as a PIL image in memory
+            return convert_from_path(
+                file_path, dpi=dpi, output_folder=tmp, paths_only=True,
+                first_page=pages[0], last_page=pages[1], thread_count=OCR_WORKERS
+            )
+
+        pending = raster.submit(rasterize, windows[0]) if windows else None
+        for k in range(len(windows)):
+            paths = pending.result()
+            # pdftoppm for the next window runs while tesseract works on this one
+            pending = raster.submit(rasterize, windows[k + 1]) if k + 1 < len(windows) else None
+            # tesseract runs out of process, so threads overlap the page OCR without GIL contention
+            texts.extend(ex.map(lambda p: _ocr_page_file(p, lang), paths))
+    return texts
+
+_IMAGE_SUFFIXES = frozenset({".jpg", ".jpeg", ".png", ".tiff", ".bmp"})
+
 def extract_text(file_path: str, lang: str = "eng") -> str:
     """
     Extract text from image or PDF files using OCR
@@ -51,13 +108,11 @@ def extract_text(file_path: str, lang: str = "eng") -> str:
     ext = os.path.splitext(file_path)[-1].lower()
     text = ""
     
-    if ext in [".jpg", ".jpeg", ".png", ".tiff", ".bmp"]:
+    if ext in _IMAGE_SUFFIXES:
         img = Image.open(file_path)
         text = pytesseract.image_to_string(img, lang=lang)
     elif ext == ".pdf":
-        pages = convert_from_path(file_path, dpi=300)
-        for page_img in pages:
-            page_text = pytesseract.image_to_string(page_img, lang=lang)
+        for page_text in ocr_pdf_pages(file_path, lang=lang, dpi=300):
             text += page_text + "\n"
     else:
         raise ValueError(f"Unsupported file type: {ext}")
@@ -66,6 +121,27 @@ def extract_text(file_path: str, lang: str = "eng") -> str:
     text = re.sub(r"(?<!\s)(\d+\.\d+)", r" \1", text)
     return text.strip()
 
+# Text layers shorter than this are treated as scans and sent to OCR
+MIN_TEXT_LAYER_CHARS = 200
+
+def extract_text_smart(file_path: str, lang: str = "eng") -> str:
+    """
+    Extract text, reading a PDF's embedded text layer before falling back to OCR
+    
+    Args:
+        file_path: Path to the file
+        lang: Language code for OCR (default: eng)
+    
+    Returns:
+        Extracted text as string
+    """
+    if file_path.lower().endswith(".pdf"):
+        from app.services.pdf_pages import extract_pdf_text
+        text = extract_pdf_text(file_path)
+        if len(text.strip()) >= MIN_TEXT_LAYER_CHARS:
+            return text.strip()
+    return extract_text(file_path, lang)
+
 def extract_text_from_pdf(file_path: str, lang: str = "eng") -> str:
     """
     Extract text specifically from PDF files
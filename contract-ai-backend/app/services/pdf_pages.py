@@ -1,18 +1,113 @@
-from pdfminer.high_level import extract_text_to_fp
+import os
+import threading
+import multiprocessing
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+from pdfminer.converter import TextConverter
 from pdfminer.layout import LAParams
+from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+from pdfminer.pdfpage import PDFPage
 from io import StringIO
 
-def extract_pages_text(file_path: str) -> list[tuple[int, str]]:
-    """
-    Returns [(page_no (1-based), page_text), ...]
-    """
-    from pdfminer.pdfpage import PDFPage
-    pages_out: list[tuple[int, str]] = []
+try:
+    import fitz  # PyMuPDF
+    HAVE_FITZ = hasattr(fitz, "open")
+except Exception:
+    fitz = None
+    HAVE_FITZ = False
+
+# Below this many pages a worker pool costs more than it saves
+PARALLEL_MIN_PAGES = 8
+
+# One page-extraction pool per process, started on first use; workers import pdfminer once
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> concurrent.futures.ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=os.cpu_count() or 1,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _pool
+
+def _drop_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+def _pages_text(file_path: str, first: int = 1, last: int | None = None) -> list[tuple[int, str]]:
+    """Text of pages first..last (1-based, inclusive) in one pass over the file"""
+    rsrcmgr = PDFResourceManager()
     laparams = LAParams()
+    pages_out: list[tuple[int, str]] = []
     with open(file_path, "rb") as fp:
         for pno, page in enumerate(PDFPage.get_pages(fp), start=1):
-            # render a single page to text
+            if pno < first:
+                continue
+            if last is not None and pno > last:
+                break
+            # render a single page to text (same converter setup as extract_text_to_fp)
             f = StringIO()
-            extract_text_to_fp(open(file_path, "rb"), f, laparams=laparams, page_numbers=[pno-1])
+            device = TextConverter(rsrcmgr, f, codec="utf-8", laparams=laparams)
+            PDFPageInterpreter(rsrcmgr, device).process_page(page)
+            device.close()
             pages_out.append((pno, f.getvalue()))
     return pages_out
+
+def _page_range_text(args: tuple[str, int, int]) -> list[tuple[int, str]]:
+    return _pages_text(*args)
+
+def extract_pdf_text(file_path: str) -> str:
+    """
+    Full text layer of a PDF, read with PyMuPDF when available (several times
+    faster than pdfminer); pdfminer is kept as the fallback when that yields nothing
+    """
+    if HAVE_FITZ:
+        try:
+            with fitz.open(file_path) as doc:
+                text = "\n".join(page.get_text() for page in doc)
+            if text.strip():
+                return text
+        except Exception:
+            pass
+    from pdfminer.high_level import extract_text
+    return extract_text(file_path) or ""
+
+def extract_pages_text(file_path: str) -> list[tuple[int, str]]:
+    """
+    Returns [(page_no (1-based), page_text), ...]
+    """
+    return _pages_text(file_path)
+
+def extract_pages_text_parallel(file_path: str, max_workers: int | None = None) -> list[tuple[int, str]]:
+    """
+    Like extract_pages_text(), but splits the page range across worker processes
+
+    Runs serially when called from a worker process itself (e.g. the ingest pool), so
+    pools are never nested.
+
+    Returns [(page_no (1-based), page_text), ...] in page order
+    """
+    if multiprocessing.parent_process() is not None:
+        return _pages_text(file_path)
+    with open(file_path, "rb") as fp:
+        n_pages = sum(1 for _ in PDFPage.get_pages(fp))
+    workers = min(max_workers or os.cpu_count() or 1, n_pages)
+    if n_pages < PARALLEL_MIN_PAGES or workers <= 1:
+        return _pages_text(file_path)
+
+    step = -(-n_pages // workers)
+    ranges = [(file_path, first, min(first + step - 1, n_pages)) for first in range(1, n_pages + 1, step)]
+    try:
+        parts = list(_get_pool().map(_page_range_text, ranges))
+    except (OSError, BrokenProcessPool):
+        # A dead pool is replaced on the next call; this document is read serially
+        _drop_pool()
+        return _pages_text(file_path)
+    return sorted((p for part in parts for p in part), key=lambda p: p[0])
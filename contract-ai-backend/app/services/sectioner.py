@@ -18,6 +18,15 @@ def section_text_best(pdf_path: str, raw_text: str | None = None):
             raw_text = extract_text(pdf_path) or ""
         return section_text_with_pages([(1, raw_text)])
 
+# Header patterns for section_text_with_pages, compiled once at import
+_RE_NUMERIC = re.compile(r"^(?:\d+(?:\.\d+)*[.)]?)\s+[A-Z]")
+_RE_SECTION_START = re.compile(r"^(?:Section|Article)\s+\d+(?:\.\d+)*\b", re.IGNORECASE)
+_RE_LETTERED_START = re.compile(r"^[A-Z][.)]\s+[A-Z]")
+_RE_TITLE_CASE = re.compile(r"^[A-Z][a-z]+(?:\s+[A-Z][a-z]+){0,7}$")
+_RE_DEF_NUM = re.compile(r"^\s*(\d+\.\d+)\s*[\"']?([A-Za-z][^\"'\n]+)[\"']?\s*", re.UNICODE)
+_RE_DEF_SPLIT_INLINE = re.compile(r"\s(?=(\d+\.\d+)[\"'\s])")
+_PREAMBLE = frozenset({"WHEREAS", "NOW, THEREFORE"})
+
 def section_text_with_pages(paged_text: List[Tuple[int, str]], max_title_len: int = 160) -> List[Dict[str, object]]:
     """
     Input: paged_text = [(page_no (1-based), page_text), ...]
@@ -32,19 +41,11 @@ def section_text_with_pages(paged_text: List[Tuple[int, str]], max_title_len: in
         ok = all(ch.isupper() or ch.isdigit() or ch in " -_/&(),.'’'\":;." for ch in s)
         return ok and any(c.isalpha() for c in s)
 
-    RE_NUMERIC = re.compile(r"^(?:\d+(?:\.\d+)*[.)]?)\s+[A-Z]")
-    RE_SECTION = re.compile(r"^(?:Section|Article)\s+\d+(?:\.\d+)*\b", re.IGNORECASE)
-    RE_LETTERED = re.compile(r"^[A-Z][.)]\s+[A-Z]")
-    RE_TITLE_CASE = re.compile(r"^[A-Z][a-z]+(?:\s+[A-Z][a-z]+){0,7}$")
-    RE_DEF_NUM = re.compile(r"^\s*(\d+\.\d+)\s*[\"']?([A-Za-z][^\"'\n]+)[\"']?\s*", re.UNICODE)
-    RE_DEF_SPLIT_INLINE = re.compile(r"\s(?=(\d+\.\d+)[\"'\s])")
-    PREAMBLE = {"WHEREAS", "NOW, THEREFORE"}
-
     def looks_like_header(line: str) -> bool:
         s = line.strip().replace("—", "-")
-        if RE_DEF_NUM.match(s):
+        if _RE_DEF_NUM.match(s):
             return True
-        return bool(RE_SECTION.match(s) or RE_NUMERIC.match(s) or RE_LETTERED.match(s) or RE_TITLE_CASE.match(s))
+        return bool(_RE_SECTION_START.match(s) or _RE_NUMERIC.match(s) or _RE_LETTERED_START.match(s) or _RE_TITLE_CASE.match(s))
 
     def merge_soft_wraps(lines: List[str]) -> List[str]:
         merged, buf = [], ""
@@ -89,6 +90,24 @@ def section_text_with_pages(paged_text: List[Tuple[int, str]], max_title_len: in
         for ln in ptxt.splitlines():
             lines_with_pages.append((pno, ln))
 
+    n_lines = len(lines_with_pages)
+    # Index of the next non-blank line after each position, filled in one backward pass
+    next_nonblank = [n_lines] * n_lines
+    nxt = n_lines
+    for k in range(n_lines - 1, -1, -1):
+        next_nonblank[k] = nxt
+        if lines_with_pages[k][1].strip():
+            nxt = k
+    # Each line is tested as a header at most once (as itself and as the next line)
+    header_memo: List[bool | None] = [None] * n_lines
+
+    def is_header_line(k: int) -> bool:
+        flag = header_memo[k]
+        if flag is None:
+            s = lines_with_pages[k][1].strip()
+            flag = header_memo[k] = bool(s) and (is_all_caps(s) or looks_like_header(s))
+        return flag
+
     sections: List[Dict[str, object]] = []
     cur_title: str | None = None
     cur_body: List[str] = []
@@ -112,13 +131,13 @@ def section_text_with_pages(paged_text: List[Tuple[int, str]], max_title_len: in
         cur_title, cur_body, cur_min_page, cur_max_page = None, [], None, None
 
     i = 0
-    while i < len(lines_with_pages):
+    while i < n_lines:
         pno, ln = lines_with_pages[i]
         ln_stripped = ln.strip()
         # 1) If multiple definitions were OCR-glued into the same line, split inline
-        if RE_DEF_NUM.search(ln) and (" 1." in ln or RE_DEF_SPLIT_INLINE.search(ln)):
+        if _RE_DEF_NUM.search(ln) and (" 1." in ln or _RE_DEF_SPLIT_INLINE.search(ln)):
             parts = []
-            tokens = list(RE_DEF_NUM.finditer(ln))
+            tokens = list(_RE_DEF_NUM.finditer(ln))
             idxs = [m.start() for m in tokens]
             if idxs and idxs[0] != 0:
                 idxs = [0] + idxs
@@ -129,7 +148,7 @@ def section_text_with_pages(paged_text: List[Tuple[int, str]], max_title_len: in
                     parts.append(seg)
             for seg in parts:
                 hdr = None
-                m = RE_DEF_NUM.match(seg)
+                m = _RE_DEF_NUM.match(seg)
                 if m:
                     num = m.group(1)
                     term = m.group(2).strip().strip(" .:;,-—")
@@ -149,7 +168,7 @@ def section_text_with_pages(paged_text: List[Tuple[int, str]], max_title_len: in
             continue
         # 2) Regular definition header on a single line
         hdr = None
-        m = RE_DEF_NUM.match(ln)
+        m = _RE_DEF_NUM.match(ln)
         if m:
             num = m.group(1)
             term = m.group(2).strip().strip(" .:;,-—")
@@ -166,13 +185,9 @@ def section_text_with_pages(paged_text: List[Tuple[int, str]], max_title_len: in
             i += 1
             continue
         # 3) Other headers (Section/Article/A./3.)
-        is_next_header = False
-        j = i + 1
-        while j < len(lines_with_pages) and not lines_with_pages[j][1].strip():
-            j += 1
-        next_line = lines_with_pages[j][1].strip() if j < len(lines_with_pages) else ""
-        is_next_header = next_line and (is_all_caps(next_line) or looks_like_header(next_line))
-        if ln_stripped and (is_all_caps(ln_stripped) or looks_like_header(ln_stripped) or ln_stripped in PREAMBLE) and (len(ln_stripped) <= 160 or not is_next_header):
+        j = next_nonblank[i]
+        is_next_header = j < n_lines and is_header_line(j)
+        if ln_stripped and (is_header_line(i) or ln_stripped in _PREAMBLE) and (len(ln_stripped) <= 160 or not is_next_header):
             if cur_title is not None or cur_body:
                 flush()
             cur_title = " ".join(ln_stripped.split())
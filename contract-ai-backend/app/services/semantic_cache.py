@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import hashlib
+from typing import Any, Dict, Optional
+from app.db.vector import chroma_manager
+from app.services.embeddings import embed_text
+from app.utils.ids import new_id
+
+# Chroma collection holding cached LLM decisions
+SEMANTIC_CACHE_COLLECTION = "policy_decision_cache"
+
+# Decisions are reused only for the exact same (normalized) key text by default: rules that
+# differ in a number or a negation ("30 days" / "60 days", "shall" / "shall not") embed
+# almost identically and must not share a verdict
+SEMANTIC_CACHE_FUZZY = os.getenv("SEMANTIC_CACHE_FUZZY", "0") == "1"
+
+# Minimum cosine similarity between key texts for a cached decision to be reused (fuzzy mode only)
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.995"))
+
+# Cached decisions older than this are ignored and purged
+SEMANTIC_CACHE_TTL_S = int(os.getenv("SEMANTIC_CACHE_TTL_S", str(7 * 24 * 3600)))
+
+def _scope_id(scope: str) -> str:
+    return hashlib.sha256(scope.encode("utf-8")).hexdigest()
+
+def _key_id(scope: str, key_text: str) -> str:
+    """Exact key: scope plus the whitespace-normalized key text"""
+    normalized = " ".join(key_text.split())
+    return hashlib.sha256(f"{scope}\x00{normalized}".encode("utf-8")).hexdigest()
+
+def _decode(md: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Cached decision from entry metadata, or None if expired or malformed"""
+    md = md or {}
+    if time.time() - float(md.get("ts", 0)) > SEMANTIC_CACHE_TTL_S:
+        return None
+    try:
+        return json.loads(md["response_json"])
+    except (KeyError, ValueError):
+        return None
+
+def _get_fuzzy(scope: str, key_text: str) -> Optional[Dict[str, Any]]:
+    res = chroma_manager.search_similar(
+        query_embedding=embed_text(key_text),
+        collection_name=SEMANTIC_CACHE_COLLECTION,
+        top_k=1,
+        where={"scope": _scope_id(scope)},
+        include=["metadatas", "distances"]
+    )
+    distances = (res.get("distances") or [[]])[0]
+    metadatas = (res.get("metadatas") or [[]])[0]
+    if not distances or not metadatas:
+        return None
+    if 1.0 - distances[0] < SEMANTIC_CACHE_THRESHOLD:
+        return None
+    return _decode(metadatas[0])
+
+def get(scope: str, key_text: str) -> Optional[Dict[str, Any]]:
+    """
+    Look up a cached decision for the same key text
+    
+    Args:
+        scope: Exact-match part of the key (e.g. contract and evidence chunk texts)
+        key_text: Policy rule; matched exactly after whitespace normalization, or by
+            embedding similarity when SEMANTIC_CACHE_FUZZY is enabled
+    
+    Returns:
+        The cached decision, or None on a miss or lookup failure
+    """
+    try:
+        if SEMANTIC_CACHE_FUZZY:
+            return _get_fuzzy(scope, key_text)
+        res = chroma_manager.get_documents(
+            # Expired duplicates of the key may still be stored until purge_expired runs
+            where={"$and": [
+                {"key": _key_id(scope, key_text)},
+                {"ts": {"$gte": time.time() - SEMANTIC_CACHE_TTL_S}}
+            ]},
+            limit=1,
+            include=["metadatas"],
+            collection_name=SEMANTIC_CACHE_COLLECTION
+        )
+    except Exception as e:
+        print(f"⚠️ Semantic cache lookup failed: {e}")
+        return None
+    metadatas = res.get("metadatas") or []
+    return _decode(metadatas[0]) if metadatas else None
+
+def put(scope: str, key_text: str, value: Dict[str, Any]) -> None:
+    """Store a decision under (scope, key_text); failures are logged and ignored"""
+    try:
+        chroma_manager.add_documents(
+            documents=[key_text],
+            embeddings=[embed_text(key_text)],
+            metadatas=[{
+                "key": _key_id(scope, key_text),
+                "scope": _scope_id(scope),
+                "response_json": json.dumps(value),
+                "ts": time.time()
+            }],
+            ids=[new_id()],
+            collection_name=SEMANTIC_CACHE_COLLECTION
+        )
+    except Exception as e:
+        print(f"⚠️ Could not write to semantic cache: {e}")
+
+def purge_expired() -> int:
+    """
+    Delete cached decisions older than SEMANTIC_CACHE_TTL_S
+
+    Returns:
+        Number of entries deleted
+    """
+    cutoff = time.time() - SEMANTIC_CACHE_TTL_S
+    res = chroma_manager.get_documents(
+        where={"ts": {"$lt": cutoff}},
+        include=[],
+        collection_name=SEMANTIC_CACHE_COLLECTION
+    )
+    ids = list(res.get("ids") or [])
+    if ids:
+        chroma_manager.delete_documents(ids=ids, collection_name=SEMANTIC_CACHE_COLLECTION)
+    return len(ids)
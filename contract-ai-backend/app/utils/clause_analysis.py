@@ -1,10 +1,14 @@
+CHECKLIST_KEYWORDS = (
+    ("confidentiality_clause", "confidentiality"),
+    ("liability_clause", "liability"),
+    ("payment_terms", "payment"),
+    ("intellectual_property", "intellectual property"),
+    ("termination_clause", "termination"),
+)
+
 def analyze_contract(text: str):
     """Very simple rule-based contract checklist (extendable with LLMs later)"""
-    checklist = {
-        "confidentiality_clause": "confidentiality" in text.lower(),
-        "liability_clause": "liability" in text.lower(),
-        "payment_terms": "payment" in text.lower(),
-        "intellectual_property": "intellectual property" in text.lower(),
-        "termination_clause": "termination" in text.lower(),
-    }
-    return checklist
\ No newline at end of file
+    # Case-fold the contract once; each keyword is then a plain substring search
+    lowered = text.lower()
+    checklist = {key: keyword in lowered for key, keyword in CHECKLIST_KEYWORDS}
+    return checklist
@@ -0,0 +1,24 @@
+import os
+import time
+import uuid
+import threading
+
+_seq_lock = threading.Lock()
+_last_seq = 0
+
+def new_id() -> str:
+    """Time-ordered UUIDv7 string, so IDs created together sort and index together"""
+    if hasattr(uuid, "uuid7"):  # Python 3.14+
+        return str(uuid.uuid7())
+    # RFC 9562 layout: 48-bit ms timestamp | version 7 | 12 random bits | variant 10 | 62 random bits
+    ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big")
+    value = ((ms & ((1 << 48) - 1)) << 80) | (0x7 << 76) | ((rand >> 68) << 64) | (0b10 << 62) | (rand & ((1 << 62) - 1))
+    return str(uuid.UUID(int=value))
+
+def new_seq() -> int:
+    """Strictly increasing int64 (nanosecond clock) for ordering rows by a numeric metadata key"""
+    global _last_seq
+    with _seq_lock:
+        _last_seq = max(_last_seq + 1, time.time_ns())
+        return _last_seq